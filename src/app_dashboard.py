@@ -1,16 +1,17 @@
 import streamlit as st
 from streamlit_autorefresh import st_autorefresh
-import time
 import pandas as pd
 
-from data.data_loader import load_asset_universe, get_live_prices_batch
-from ui.ui_components import apply_theme_and_css, render_ticker_tape, render_footer
+from data.asset_catalog import get_asset_catalog
+from data.quote_refresher import get_quote_refresher
+from ui.ui_components import apply_theme_and_css, render_ticker_tape, render_footer, get_session_id, submit_and_wait
 
 from ui.views_single import render_single_asset_view
 from ui.views_portfolio import render_portfolio_view
 from ui.views_reports import render_reports_view 
 
 from data.database import init_db, get_active_tickers_db, add_active_ticker_db, remove_active_ticker_db
+from data.write_queue import get_write_queue
 
 st.set_page_config(page_title="Quant Dashboard", layout="wide", initial_sidebar_state="collapsed")
 
@@ -31,6 +32,15 @@ def init_global_state():
     else:
         st.session_state['tape_tickers'] = db_tickers
 
+@st.fragment(run_every=15)
+def render_live_tape():
+    # Lecture instantanée de la table partagée : aucun appel Yahoo pendant le rendu
+    tickers = st.session_state['tape_tickers']
+    quotes = get_quote_refresher()
+    quotes.watch(tickers)
+    snap = quotes.snapshot(tickers)
+    render_ticker_tape({t: p for t, (p, _) in snap.items()}, ages={t: a for t, (_, a) in snap.items()})
+
 def main():
     st_autorefresh(interval=5 * 60 * 1000, key="global_refresh")
     
@@ -55,56 +65,60 @@ def main():
     
     apply_theme_and_css(is_dark_mode=not is_light)
     
-    df_assets = load_asset_universe()
+    catalog = get_asset_catalog()
     
     # --- TICKER TAPE BAR ---
     st.write("") 
     c_tape, c_add, c_del = st.columns([12, 0.5, 0.5])
     
     with c_tape:
-        prices = get_live_prices_batch(st.session_state['tape_tickers'])
-        render_ticker_tape(prices)
+        render_live_tape()
         
     with c_add:
         with st.popover("➕", help="Add ticker"):
             st.markdown("**Add Asset (Max 10)**")
             
-            # 1. Index
-            idx_list = df_assets['Index'].unique()
-            sel_idx = st.selectbox("Index", idx_list, key="tp_idx")
-            
-            # 2. Sector (Avec option ALL)
-            avail_sec = sorted(df_assets[df_assets['Index'] == sel_idx]['Sector'].unique())
-            sec_options = ["ALL"] + list(avail_sec)
-            sel_sec = st.selectbox("Sector", sec_options, key="tp_sec")
+            # 0. Recherche directe (symbole ou nom), sinon navigation Index / Secteur
+            query = st.text_input("Search", placeholder="Symbol or name", key="tp_q")
             
-            # 3. Filtrage
-            if sel_sec == "ALL":
-                mask = (df_assets['Index'] == sel_idx)
+            if query:
+                filtered = catalog.search(query, limit=50)
             else:
-                mask = (df_assets['Index'] == sel_idx) & (df_assets['Sector'] == sel_sec)
+                # 1. Index
+                sel_idx = st.selectbox("Index", catalog.indices(), key="tp_idx")
+                
+                # 2. Sector (Avec option ALL)
+                sec_options = ["ALL"] + catalog.sectors(sel_idx)
+                sel_sec = st.selectbox("Sector", sec_options, key="tp_sec")
                 
-            filtered = df_assets[mask].copy()
-            filtered['Label'] = filtered['Name'] + " (" + filtered['Symbol'] + ")"
+                # 3. Filtrage (index précalculés)
+                filtered = catalog.filter(sel_idx, None if sel_sec == "ALL" else sel_sec)
             
-            sel_asset_label = st.selectbox("Asset", filtered['Label'], key="tp_ast")
+            sym = st.selectbox(
+                "Asset", filtered['Symbol'].tolist(), key="tp_ast",
+                format_func=lambda s: f"{catalog.name(s)} ({s})"
+            )
             
             if st.button("Add", type="primary", use_container_width=True):
                 # --- LOGIQUE MIXTE (DB + UI) ---
-                if not filtered.empty:
-                    sym = filtered[filtered['Label'] == sel_asset_label]['Symbol'].values[0]
-                    
-                    # 1. Appel DB
-                    ok, msg = add_active_ticker_db(sym)
-                    
-                    if ok:
-                        # 2. Mise à jour Session State (pour affichage immédiat)
-                        st.session_state['tape_tickers'].append(sym)
-                        st.toast(f"Success! {sym} added.", icon="✅")
-                        time.sleep(0.5)
-                        st.rerun()
+                if sym:
+                    # 1. Validation sur l'état de la session (même règles que add_active_ticker_db)
+                    current = st.session_state['tape_tickers']
+                    if len(current) >= 10:
+                        st.toast("Error: Max 10 tickers allowed.", icon="⚠️")
+                    elif sym in current:
+                        st.toast("Error: Ticker already exists.", icon="⚠️")
                     else:
-                        st.toast(f"Error: {msg}", icon="⚠️")
+                        # 2. Écriture DB via la file ; la table est partagée entre sessions,
+                        #    on n'affiche le ticker que si la base l'a accepté
+                        done, result = submit_and_wait(add_active_ticker_db, sym)
+                        ok, msg = result if done else (False, result)
+                        if ok:
+                            current.append(sym)
+                            st.toast(f"Success! {sym} added.", icon="✅")
+                            st.rerun()
+                        else:
+                            st.toast(f"Error: {msg}", icon="⚠️")
                 else:
                     st.toast("Error: Selection empty", icon="❌")
 
@@ -114,14 +128,13 @@ def main():
             to_del = st.selectbox("Select to remove", st.session_state['tape_tickers'], key="tp_del_sel")
             
             if st.button("Remove", type="primary", use_container_width=True):
-                # 1. Appel DB
-                remove_active_ticker_db(to_del)
+                # 1. Écriture DB en arrière-plan
+                get_write_queue().submit(remove_active_ticker_db, to_del, session=get_session_id())
                 
                 # 2. Mise à jour Session State
                 if to_del in st.session_state['tape_tickers']:
                     st.session_state['tape_tickers'].remove(to_del)
                     st.toast(f"Success! {to_del} removed.", icon="✅")
-                    time.sleep(0.5)
                     st.rerun()
 
     # --- NAVIGATION (TABS) ---
@@ -134,9 +147,8 @@ def main():
     if not current_tickers:
         df_view_assets = pd.DataFrame(columns=['Symbol', 'Name'])
     else:
-        # Petit lookup rapide pour avoir les noms complets
-        lookup = df_assets.set_index('Symbol')['Name'].to_dict()
-        data_view = [{'Symbol': t, 'Name': lookup.get(t, t)} for t in current_tickers]
+        # Lookup direct dans le catalogue pour avoir les noms complets
+        data_view = [{'Symbol': t, 'Name': catalog.name(t)} for t in current_tickers]
         df_view_assets = pd.DataFrame(data_view)
     
     with tab1:
@@ -0,0 +1,182 @@
+"""
+Catalogue indexé de l'univers d'actifs (CAC40, S&P500, Crypto, Forex).
+
+Les CSV sont lus une seule fois par processus puis partagés entre toutes
+les sessions ; le catalogue est reconstruit seulement si un fichier change
+(date de modification). Les filtres Index / Secteur et la recherche par
+symbole ou par nom utilisent des index précalculés au lieu de masques
+booléens sur des colonnes texte.
+"""
+
+from __future__ import annotations
+
+import difflib
+import os
+import threading
+from bisect import bisect_left
+
+import pandas as pd
+
+# Fichiers chargés et "Index" associé
+UNIVERSE_FILES = [
+    ("CAC40.csv", "CAC 40"),
+    ("S&P500.csv", "S&P 500"),
+    ("crypto.csv", "Crypto"),
+    ("currencies.csv", "Forex"),
+]
+
+FALLBACK_UNIVERSE = {
+    "Symbol": ["^FCHI", "BTC-USD"],
+    "Name": ["CAC 40", "Bitcoin"],
+    "Sector": ["Index", "Cryptocurrency"],
+    "Index": ["CAC 40", "Crypto"],
+}
+
+
+def get_assets_dir():
+    # src/data -> src -> racine du projet -> assets
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.dirname(os.path.dirname(current_dir))
+    return os.path.join(root_dir, "assets")
+
+
+class AssetCatalog:
+    """Univers d'actifs avec index par symbole, par (Index, Secteur) et par préfixe."""
+
+    def __init__(self, frame: pd.DataFrame):
+        df = frame.reset_index(drop=True).copy()
+        for col in ("Symbol", "Name", "Sector", "Index"):
+            if col not in df.columns:
+                df[col] = ""
+        df["Symbol"] = df["Symbol"].astype(str)
+        df["Name"] = df["Name"].fillna(df["Symbol"]).astype(str)
+        df["Sector"] = pd.Categorical(df["Sector"].fillna("").astype(str))
+        df["Index"] = pd.Categorical(df["Index"].astype(str), categories=list(dict.fromkeys(df["Index"].astype(str))))
+        self.frame = df
+
+        # Symbole -> position (la première occurrence gagne si un symbole est dans 2 indices)
+        self._by_symbol = {}
+        for pos, sym in enumerate(df["Symbol"]):
+            self._by_symbol.setdefault(sym, pos)
+
+        self._by_index = df.groupby("Index", observed=True).indices
+        self._by_group = df.groupby(["Index", "Sector"], observed=True).indices
+
+        # Clés de recherche triées : symbole, nom complet et chaque mot du nom
+        keys = []
+        for pos, (sym, name) in enumerate(zip(df["Symbol"], df["Name"])):
+            name_l = name.lower()
+            keys.append((sym.lower(), 0, pos))
+            keys.append((name_l, 1, pos))
+            for word in name_l.split()[1:]:
+                keys.append((word, 2, pos))
+        keys.sort()
+        self._keys = [k for k, _, _ in keys]
+        self._key_rank = [r for _, r, _ in keys]
+        self._key_pos = [p for _, _, p in keys]
+        self._names_lower = {}
+        for pos, name in enumerate(df["Name"]):
+            self._names_lower.setdefault(name.lower(), []).append(pos)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def indices(self):
+        return list(self.frame["Index"].cat.categories)
+
+    def sectors(self, index):
+        positions = self._by_index.get(index, [])
+        return sorted(self.frame["Sector"].iloc[positions].unique().tolist())
+
+    def filter(self, index, sector=None) -> pd.DataFrame:
+        """Actifs d'un Index (et éventuellement d'un Secteur), sans masque booléen."""
+        if sector is None:
+            positions = self._by_index.get(index, [])
+        else:
+            positions = self._by_group.get((index, sector), [])
+        return self.frame.iloc[positions]
+
+    def lookup(self, symbol):
+        pos = self._by_symbol.get(symbol)
+        return None if pos is None else self.frame.iloc[pos]
+
+    def name(self, symbol, default=None):
+        pos = self._by_symbol.get(symbol)
+        if pos is None:
+            return symbol if default is None else default
+        return self.frame["Name"].iat[pos]
+
+    def search(self, query, limit=20) -> pd.DataFrame:
+        """
+        Recherche par préfixe (symbole, nom ou mot du nom), complétée par une
+        recherche approchée sur les noms s'il y a moins de `limit` résultats.
+        Ordre : symbole exact, préfixes de symbole, préfixes de nom, approché.
+        """
+        q = query.strip().lower()
+        if not q:
+            return self.frame.iloc[0:0]
+
+        lo = bisect_left(self._keys, q)
+        hi = bisect_left(self._keys, q + "\uffff")
+        hits = sorted(
+            range(lo, hi),
+            key=lambda i: (self._keys[i] != q or self._key_rank[i] != 0, self._key_rank[i], len(self._keys[i])),
+        )
+        positions = list(dict.fromkeys(self._key_pos[i] for i in hits))[:limit]
+
+        if len(positions) < limit and len(q) >= 3:
+            close = difflib.get_close_matches(q, self._names_lower.keys(), n=limit, cutoff=0.6)
+            seen = set(positions)
+            for name in close:
+                for pos in self._names_lower[name]:
+                    if pos not in seen:
+                        positions.append(pos)
+                        seen.add(pos)
+            positions = positions[:limit]
+
+        return self.frame.iloc[positions]
+
+
+def _files_signature(assets_dir):
+    """(chemin, mtime) de chaque CSV : change dès qu'un fichier est modifié."""
+    sig = []
+    for filename, _ in UNIVERSE_FILES:
+        path = os.path.join(assets_dir, filename)
+        sig.append((path, os.path.getmtime(path) if os.path.exists(path) else None))
+    return tuple(sig)
+
+
+def _read_universe(assets_dir) -> pd.DataFrame:
+    dfs = []
+    for filename, idx_name in UNIVERSE_FILES:
+        path = os.path.join(assets_dir, filename)
+        if os.path.exists(path):
+            try:
+                df = pd.read_csv(path)
+                if not df.empty:
+                    df["Index"] = idx_name
+                    dfs.append(df)
+            except pd.errors.EmptyDataError:
+                pass
+
+    if not dfs:
+        # Fallback if everything is empty
+        return pd.DataFrame(FALLBACK_UNIVERSE)
+    return pd.concat(dfs, ignore_index=True)
+
+
+_catalog = None
+_catalog_sig = None
+_catalog_lock = threading.Lock()
+
+
+def get_asset_catalog(assets_dir=None) -> AssetCatalog:
+    """Catalogue partagé du processus, reconstruit si un CSV a changé."""
+    global _catalog, _catalog_sig
+    assets_dir = assets_dir or get_assets_dir()
+    sig = _files_signature(assets_dir)
+    with _catalog_lock:
+        if _catalog is None or sig != _catalog_sig:
+            _catalog = AssetCatalog(_read_universe(assets_dir))
+            _catalog_sig = sig
+        return _catalog
@@ -1,21 +1,125 @@
 from __future__ import annotations
 
+from contextlib import ExitStack
 from datetime import date, timedelta
 
 import pandas as pd
-import yfinance as yf
+
+from data.market_data import OHLCV_COLUMNS, get_provider
+from data.price_cache import (
+    cache_lock,
+    merge_bars,
+    overlap_is_consistent,
+    read_cached_bars,
+    write_cached_bars,
+)
+from data.single_flight import price_fetches
 
 # Actif principal pour le module Quant A : Air Liquide
 DEFAULT_TICKER = "AI.PA"
 
+# Recouvrement (en jours) lors d'un téléchargement incrémental, pour détecter
+# un réajustement de l'historique (dividendes / splits)
+_INCREMENTAL_OVERLAP_DAYS = 7
+
+
+def _download_bars(ticker: str, start: date, end: date, interval: str) -> pd.DataFrame:
+    """Télécharge les barres OHLCV brutes [start, end) via le provider actif."""
+    return get_provider().get_bars(ticker, start=start, end=end, interval=interval)
+
+
+def _slice_window(bars: pd.DataFrame, start: date, end: date) -> pd.DataFrame:
+    """Garde les barres de [start, end), index naïf (daily) ou avec fuseau (intraday)."""
+    lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+    tz = getattr(bars.index, "tz", None)
+    if tz is not None:
+        lo, hi = lo.tz_localize(tz), hi.tz_localize(tz)
+    return bars[(bars.index >= lo) & (bars.index < hi)]
+
+
+def _fetch_plan(cached, meta: dict, start: date, end: date):
+    """
+    Décide quoi télécharger pour couvrir [start, end) à partir du cache.
+
+    Returns
+    -------
+    (mode, fetch_start, coverage_start)
+        mode = 'full'        : rien d'utilisable en cache, on télécharge [start, end) ;
+        mode = 'fresh'       : cache déjà téléchargé jusqu'à `end`, lecture locale seule ;
+        mode = 'incremental' : on ne télécharge que les barres après la dernière
+                               date en cache (avec un petit recouvrement de contrôle).
+    """
+    if cached is None or start < date.fromisoformat(meta["coverage_start"]):
+        return "full", start, start
+
+    coverage_start = date.fromisoformat(meta["coverage_start"])
+    if date.fromisoformat(meta["fetched_until"]) >= end:
+        return "fresh", None, coverage_start
+
+    inc_start = cached.index[-1].date() - timedelta(days=_INCREMENTAL_OVERLAP_DAYS)
+    return "incremental", max(inc_start, coverage_start), coverage_start
+
+
+def _store_fetched(ticker, interval, source, cached, fresh, mode, coverage_start, end):
+    """
+    Fusionne les barres téléchargées avec le cache et réécrit le fichier.
+    Renvoie l'ensemble des barres connues (None si aucune).
+    """
+    if mode == "full":
+        if fresh.empty:
+            # Rien de neuf : on garde l'ancien cache tel quel
+            return cached
+        bars = fresh
+    elif fresh.empty:
+        bars = cached
+    elif overlap_is_consistent(cached, fresh):
+        bars = merge_bars(cached, fresh)
+    else:
+        # Historique réajusté par Yahoo : on repart de la couverture complète
+        bars = _download_bars(ticker, coverage_start, end, interval)
+        if bars.empty:
+            bars = cached
+
+    write_cached_bars(
+        ticker,
+        interval,
+        bars,
+        {"coverage_start": coverage_start.isoformat(), "fetched_until": end.isoformat()},
+        source,
+    )
+    return bars
+
+
+def _load_bars_cached(ticker: str, start: date, end: date, interval: str) -> pd.DataFrame:
+    """Renvoie les barres [start, end) en passant par le cache disque."""
+    source = get_provider().name
+    with cache_lock(ticker, interval, source):
+        cached, meta = read_cached_bars(ticker, interval, source)
+        mode, fetch_start, coverage_start = _fetch_plan(cached, meta, start, end)
+
+        if mode == "fresh":
+            return _slice_window(cached, start, end)
+
+        fresh = _download_bars(ticker, fetch_start, end, interval)
+        bars = _store_fetched(ticker, interval, source, cached, fresh, mode, coverage_start, end)
+        if bars is None:
+            return fresh
+        return _slice_window(bars, start, end)
+
 
 def get_price_history(
     ticker: str = DEFAULT_TICKER,
     years: int = 5,
     interval: str = "1d",
+    use_cache: bool = True,
 ) -> pd.DataFrame:
     """
-    Télécharge l'historique de prix pour un seul actif via Yahoo Finance.
+    Télécharge l'historique de prix pour un seul actif (Yahoo Finance par défaut,
+    voir `data.market_data`).
+
+    Les barres sont conservées dans un cache Parquet local (voir
+    `data.price_cache`) : un second appel ne télécharge que les barres
+    postérieures à la dernière date en cache.
 
     Parameters
     ----------
@@ -26,6 +130,8 @@ def get_price_history(
     interval : str
         Fréquence des données ('1d', '1h', '1wk', etc.).
         Pour les backtests daily, on utilisera '1d'.
+    use_cache : bool
+        False pour forcer un téléchargement complet sans toucher au cache.
 
     Returns
     -------
@@ -37,29 +143,18 @@ def get_price_history(
     end = date.today()
     start = end - timedelta(days=365 * years)
 
-    raw = yf.download(
-        ticker,
-        start=start,
-        end=end,
-        interval=interval,
-        auto_adjust=True,  # ajuste pour dividendes / splits
-        progress=False,
-    )
+    # Les sessions concurrentes qui demandent la même fenêtre partagent un seul appel
+    key = ("bars", get_provider().name, ticker, start, end, interval, use_cache)
+    if use_cache:
+        bars = price_fetches.do(key, _load_bars_cached, ticker, start, end, interval)
+    else:
+        bars = price_fetches.do(key, _download_bars, ticker, start, end, interval)
 
-    if raw.empty:
+    if bars.empty:
         raise ValueError(f"No data returned for ticker {ticker!r}")
 
-    # IMPORTANT : aplatit les colonnes si yfinance renvoie un MultiIndex
-    # Exemple de colonnes brutes :
-    #   Price   Open   High   Low   Close   Volume
-    #   Ticker  AI.PA  AI.PA  AI.PA AI.PA   AI.PA
-    if isinstance(raw.columns, pd.MultiIndex):
-        # on garde seulement le premier niveau: 'Open', 'High', 'Low', 'Close', 'Volume'
-        raw.columns = raw.columns.get_level_values(0)
-
-    # On garde les colonnes principales
-    cols_to_keep = ["Open", "High", "Low", "Close", "Volume"]
-    data = raw[cols_to_keep].copy()
+    # On garde les colonnes principales (copie : le cache ne doit pas être modifié)
+    data = bars[OHLCV_COLUMNS].copy()
 
     # Assure que l'index est trié et nommé
     data = data.sort_index()
@@ -75,6 +170,97 @@ def get_price_history(
     return data
 
 
+def get_close_matrix(
+    tickers,
+    years: int = 5,
+    interval: str = "1d",
+):
+    """
+    Clôtures de plusieurs actifs avec au plus deux téléchargements groupés.
+
+    Les tickers à jour dans le cache sont lus localement ; les autres partent
+    dans un appel `provider.get_bars_batch` pour les tickers absents du cache
+    (historique complet) et un autre pour ceux à compléter (dernières barres
+    seulement). Un ticker en échec n'empêche pas les autres d'être renvoyés ;
+    si le téléchargement échoue, son cache (s'il existe) est servi tel quel,
+    sans être marqué à jour. Les appels concurrents pour le même lot sont
+    coalescés.
+
+    Returns
+    -------
+    (closes, failures) : (pd.DataFrame, dict)
+        `closes` : index Date (union des dates), une colonne 'Close' par ticker
+        valide, dans l'ordre demandé. NaN là où un actif n'a pas coté.
+        `failures` : {ticker: message d'erreur} pour les tickers sans données
+        ou dont le téléchargement a échoué (servis depuis le cache).
+    """
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+    tickers = list(dict.fromkeys(tickers))
+
+    # Clé indépendante de l'ordre des tickers ; on rétablit l'ordre demandé après
+    key = ("closes", get_provider().name, tuple(sorted(tickers)), start, end, interval)
+    closes, failures = price_fetches.do(key, _load_close_matrix, sorted(tickers), start, end, interval)
+    cols = [t for t in tickers if t in closes.columns]
+    return closes[cols].copy(), dict(failures)
+
+
+def _load_close_matrix(tickers, start: date, end: date, interval: str):
+    """Corps de `get_close_matrix` (cache + un seul appel groupé)."""
+    provider = get_provider()
+    source = provider.name
+    series, failures = {}, {}
+
+    with ExitStack() as stack:
+        # Ordre trié : deux appels concurrents prennent les verrous dans le même ordre
+        for t in sorted(tickers):
+            stack.enter_context(cache_lock(t, interval, source))
+
+        plans = {}
+        for t in tickers:
+            cached, meta = read_cached_bars(t, interval, source)
+            plans[t] = (cached, *_fetch_plan(cached, meta, start, end))
+
+        # Un appel groupé par mode : un ticker absent du cache ne force pas le
+        # téléchargement complet de ceux qui n'ont besoin que des dernières barres
+        fetched, fetch_errors = {}, {}
+        for mode in ("full", "incremental"):
+            group = [t for t in tickers if plans[t][1] == mode]
+            if not group:
+                continue
+            batch_start = min(plans[t][2] for t in group)
+            try:
+                fetched.update(provider.get_bars_batch(group, start=batch_start, end=end, interval=interval))
+            except Exception as e:
+                fetch_errors.update({t: str(e) for t in group})
+
+        for t in tickers:
+            cached, mode, _, coverage_start = plans[t]
+            try:
+                if mode == "fresh":
+                    bars = cached
+                elif t in fetch_errors or t not in fetched:
+                    # Échec du téléchargement : on sert le cache sans le marquer à jour,
+                    # le ticker sera retenté au prochain appel
+                    failures[t] = fetch_errors.get(t, f"No data returned for ticker {t!r}")
+                    bars = cached
+                else:
+                    bars = _store_fetched(t, interval, source, cached, fetched[t], mode, coverage_start, end)
+            except Exception as e:
+                failures[t] = str(e)
+                continue
+
+            window = _slice_window(bars, start, end) if bars is not None else None
+            if window is None or window.empty:
+                failures.setdefault(t, f"No data returned for ticker {t!r}")
+                continue
+            series[t] = window["Close"].astype(float)
+
+    closes = pd.DataFrame(series).sort_index()
+    closes.index.name = "Date"
+    return closes, failures
+
+
 if __name__ == "__main__":
     # Petit test manuel : affiche les 5 dernières lignes pour l'actif par défaut
     df = get_price_history()
@@ -83,4 +269,3 @@ if __name__ == "__main__":
         f"({len(df)} rows, from {df.index[0].date()} to {df.index[-1].date()})"
     )
     print(df.tail())
-
@@ -1,6 +1,10 @@
+import re
 import sqlite3
+import threading
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from contextlib import contextmanager
 import os
 
 # Gestion du chemin pour Fly.io ou Local
@@ -9,15 +13,112 @@ if os.path.exists("/data"):
 else:
     DB_NAME = "portfolios.db"
 
+# --- CONNECTION MANAGER ---
+# Pragmas appliqués à chaque nouvelle connexion
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",     # les lectures du dashboard ne sont plus bloquées par le job
+    "PRAGMA synchronous=NORMAL",   # sûr en WAL, beaucoup moins de fsync
+    "PRAGMA busy_timeout=5000",    # attend un verrou (ms) au lieu d'échouer tout de suite
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",    # ~16 Mo de cache de pages
+)
+
+# Nombre de connexions inactives conservées par base
+POOL_SIZE = 8
+
+_pool = {}                 # chemin -> connexions inactives
+_pool_lock = threading.Lock()
+_local = threading.local() # connexion empruntée par le thread courant
+
+def _open_connection(path):
+    # isolation_level=None : pas de BEGIN implicite, les transactions sont explicites.
+    # Les requêtes sont des constantes : le cache de statements de sqlite3
+    # (cached_statements) réutilise donc les requêtes préparées d'un appel à l'autre.
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None,
+                           check_same_thread=False, cached_statements=256)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@contextmanager
+def get_connection():
+    """
+    Emprunte une connexion au pool pour la durée du bloc.
+    Les appels imbriqués dans le même thread réutilisent la même connexion.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        yield conn
+        return
+
+    path = DB_NAME
+    with _pool_lock:
+        idle = _pool.setdefault(path, [])
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _open_connection(path)
+
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        with _pool_lock:
+            idle = _pool.setdefault(path, [])
+            if len(idle) < POOL_SIZE:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+@contextmanager
+def transaction():
+    """
+    Transaction d'écriture (BEGIN IMMEDIATE : le verrou d'écriture est pris
+    dès le début, pas de blocage mutuel entre deux écrivains).
+    Commit à la sortie du bloc, rollback en cas d'exception.
+    """
+    with get_connection() as conn:
+        if conn.in_transaction:
+            # Déjà dans une transaction (appel imbriqué) : c'est l'appelant qui commit
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+def close_connections():
+    """Ferme les connexions inactives du pool (tests, arrêt du processus)."""
+    with _pool_lock:
+        conns = [c for idle in _pool.values() for c in idle]
+        _pool.clear()
+    for conn in conns:
+        conn.close()
+
+# --- SCHEMA ---
+# Version du schéma (PRAGMA user_version), incrémentée à chaque migration
+SCHEMA_VERSION = 4
+
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
+    with transaction() as conn:
+        _create_schema(conn)
+        _migrate(conn)
+
+def _create_schema(conn):
     c = conn.cursor()
     
     # Table Portefeuilles
     c.execute('''
         CREATE TABLE IF NOT EXISTS shared_portfolios (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
+            timestamp INTEGER,
             user_name TEXT,
             comment TEXT,
             tickers TEXT,
@@ -37,11 +138,69 @@ def init_db():
         )
     ''')
 
+    # Avancement des agrégations (jobs/rollup.py) : fin du dernier bucket agrégé
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            tier TEXT PRIMARY KEY,
+            watermark INTEGER
+        )
+    ''')
+
+    # État du planificateur (jobs/scheduler_daemon.py) : dernier créneau exécuté par job
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS scheduler_status (
+            job TEXT PRIMARY KEY,
+            last_slot INTEGER,
+            last_start INTEGER,
+            last_end INTEGER,
+            last_status TEXT,
+            last_result TEXT,
+            last_error TEXT,
+            next_run INTEGER
+        )
+    ''')
+
+    # Télémétrie des jobs (jobs/telemetry.py) : un run + le détail par ticker
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job TEXT,
+            started_at REAL,
+            ended_at REAL,
+            duration REAL,
+            status TEXT,
+            error TEXT,
+            tickers INTEGER,
+            failures INTEGER,
+            retries INTEGER,
+            reports INTEGER,
+            rows_fetched INTEGER,
+            bytes_fetched INTEGER,
+            fetch_seconds REAL,
+            compute_seconds REAL,
+            write_seconds REAL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs (job, started_at)")
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS job_run_tickers (
+            run_id INTEGER NOT NULL REFERENCES job_runs (id) ON DELETE CASCADE,
+            symbol TEXT NOT NULL,
+            download_seconds REAL,
+            rows INTEGER,
+            bytes INTEGER,
+            attempts INTEGER,
+            status TEXT,
+            error TEXT,
+            PRIMARY KEY (run_id, symbol)
+        )
+    ''')
+
     # Table Rapports
     c.execute('''
         CREATE TABLE IF NOT EXISTS market_reports (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
+            timestamp INTEGER,
             symbol TEXT,
             period TEXT,
             price_open REAL,
@@ -50,49 +209,199 @@ def init_db():
             price_low REAL,
             volatility REAL,
             max_drawdown REAL,
-            volume REAL
+            volume REAL,
+            bucket INTEGER
         )
     ''')
-    conn.commit()
-    conn.close()
+
+def _create_report_indexes(conn):
+    # Index composites : filtres (symbole, type, plage de dates) + tri par date
+    # résolus par l'index, sans parcourir toute la table. price_close est inclus :
+    # la série d'un graphique se lit entièrement dans l'index (index couvrant).
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_symbol_period_ts_close ON market_reports (symbol, period, timestamp, price_close)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_period_ts ON market_reports (period, timestamp)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_reports_symbol_period_bucket ON market_reports (symbol, period, bucket)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_period_bucket ON market_reports (period, bucket)")
+
+def _create_holdings_schema(conn):
+    # Créée par la migration v4 (et non dans _create_schema) : la reconstruction
+    # de shared_portfolios en v3 renomme la table parente de la clé étrangère.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_holdings (
+            portfolio_id INTEGER NOT NULL REFERENCES shared_portfolios (id) ON DELETE CASCADE,
+            symbol TEXT NOT NULL,
+            weight REAL NOT NULL,
+            PRIMARY KEY (portfolio_id, symbol)
+        )
+    ''')
+    # "Quels portefeuilles détiennent X" : lecture de l'index seul
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_holdings_symbol ON portfolio_holdings (symbol, weight, portfolio_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_portfolios_sharpe ON shared_portfolios (sharpe)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_portfolios_return ON shared_portfolios (total_return)")
+
+def _rebuild_table(conn, table, convert):
+    """
+    Recrée `table` avec le schéma courant de _create_schema (SQLite ne sait pas
+    changer le type d'une colonne) en passant chaque ligne par `convert`.
+    """
+    cols = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    rows = conn.execute(f"SELECT {', '.join(cols)} FROM {table}").fetchall()
+    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    _create_schema(conn)
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+        [tuple(convert(dict(zip(cols, row))).values()) for row in rows],
+    )
+    conn.execute(f"DROP TABLE {table}_old")
+
+def _migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    if version < 1:
+        # v1 : colonne bucket (début de période, epoch) + unicité (symbol, period, bucket)
+        cols = [row[1] for row in conn.execute("PRAGMA table_info(market_reports)")]
+        if "bucket" not in cols:
+            conn.execute("ALTER TABLE market_reports ADD COLUMN bucket INTEGER")
+        # Ancien libellé de daily_report
+        conn.execute("UPDATE market_reports SET period = 'DAILY' WHERE period = 'Daily (1d)'")
+        rows = conn.execute("SELECT id, timestamp, period FROM market_reports WHERE bucket IS NULL").fetchall()
+        conn.executemany("UPDATE market_reports SET bucket = ? WHERE id = ?",
+                         [(report_bucket(ts, period), id_) for id_, ts, period in rows])
+        # Doublons historiques : on garde le rapport le plus récent de chaque période
+        conn.execute('''
+            DELETE FROM market_reports WHERE id NOT IN (
+                SELECT MAX(id) FROM market_reports GROUP BY symbol, period, bucket
+            )
+        ''')
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_reports_symbol_period_bucket ON market_reports (symbol, period, bucket)")
+
+    if version < 2:
+        # v2 : agrégation / rétention par (type, bucket) (jobs/rollup.py)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_period_bucket ON market_reports (period, bucket)")
+
+    if version < 3:
+        # v3 : timestamps texte (heure locale du serveur) -> epoch UTC en secondes.
+        # Les buckets sont recalculés sur l'epoch UTC (identiques si le serveur est en UTC).
+        def convert_report(row):
+            row["timestamp"] = to_epoch(row["timestamp"])
+            if row["timestamp"] is not None:  # timestamp NULL : bucket d'origine conservé
+                row["bucket"] = bucket_start(row["timestamp"], row["period"])
+            return row
+
+        def convert_portfolio(row):
+            row["timestamp"] = to_epoch(row["timestamp"])
+            return row
+
+        _rebuild_table(conn, "market_reports", convert_report)
+        _rebuild_table(conn, "shared_portfolios", convert_portfolio)
+        conn.execute('''
+            DELETE FROM market_reports WHERE id NOT IN (
+                SELECT MAX(id) FROM market_reports GROUP BY symbol, period, bucket
+            )
+        ''')
+
+    if version < 4:
+        # v4 : allocations normalisées (portfolio_holdings), remplies depuis la colonne texte
+        _create_holdings_schema(conn)
+        rows = conn.execute("SELECT id, tickers FROM shared_portfolios").fetchall()
+        conn.executemany(
+            "INSERT OR IGNORE INTO portfolio_holdings (portfolio_id, symbol, weight) VALUES (?, ?, ?)",
+            [(id_, sym, w) for id_, tickers in rows for sym, w in parse_allocation(tickers).items()],
+        )
+
+    _create_report_indexes(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 # --- ACTIVE TICKERS ---
 def get_active_tickers_db():
-    conn = sqlite3.connect(DB_NAME)
     try:
-        rows = conn.execute("SELECT symbol FROM active_tickers").fetchall()
+        with get_connection() as conn:
+            rows = conn.execute("SELECT symbol FROM active_tickers").fetchall()
         return [row[0] for row in rows]
     except: return []
-    finally: conn.close()
 
 def add_active_ticker_db(symbol):
-    current = get_active_tickers_db()
-    if len(current) >= 10: return False, "Max 10 tickers allowed."
-    if symbol in current: return False, "Ticker already exists."
-    
-    conn = sqlite3.connect(DB_NAME)
     try:
-        conn.execute("INSERT INTO active_tickers (symbol) VALUES (?)", (symbol,))
-        conn.commit()
+        # Lecture + insertion dans la même transaction (et la même connexion)
+        with transaction() as conn:
+            current = get_active_tickers_db()
+            if len(current) >= 10: return False, "Max 10 tickers allowed."
+            if symbol in current: return False, "Ticker already exists."
+            conn.execute("INSERT INTO active_tickers (symbol) VALUES (?)", (symbol,))
         return True, "Added."
     except Exception as e: return False, str(e)
-    finally: conn.close()
 
 def remove_active_ticker_db(symbol):
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute("DELETE FROM active_tickers WHERE symbol = ?", (symbol,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM active_tickers WHERE symbol = ?", (symbol,))
 
 # --- MARKET REPORTS ---
-def log_market_report(data_dict):
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute('''
-        INSERT INTO market_reports 
-        (timestamp, symbol, period, price_open, price_close, price_high, price_low, volatility, max_drawdown, volume)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+# Granularité (secondes) du bucket par type de rapport : un seul rapport par
+# ticker et par bucket, une relance du job remplace le rapport existant
+BUCKET_SECONDS = {
+    'INSTANT': 60,
+    'HOURLY': 3600,
+    'DAILY': 86400,
+    'DAILY_ROLLUP': 86400,        # agrégats produits par jobs/rollup.py
+    'WEEKLY_ROLLUP': 7 * 86400,
+}
+
+# Les semaines commencent le lundi (l'epoch, 1970-01-01, est un jeudi)
+WEEK_ORIGIN = 4 * 86400
+
+def bucket_start(epoch, period):
+    """Début (epoch) du bucket de ce type de rapport contenant `epoch`."""
+    step = BUCKET_SECONDS.get(period, 60)
+    origin = WEEK_ORIGIN if step == 7 * 86400 else 0
+    return epoch - (epoch - origin) % step
+
+def to_epoch(value):
+    """
+    Epoch UTC (secondes) : nombre (epoch) tel quel, datetime/Timestamp avec
+    fuseau converti, horodatage naïf (ou texte) interprété en heure locale du
+    serveur, comme l'était datetime.now(). None pour une valeur manquante
+    (None, NaN, NaT, texte vide).
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts is pd.NaT:
+        return None
+    if ts.tz is None:
+        return int(ts.to_pydatetime().timestamp())
+    return int(ts.timestamp())
+
+def report_bucket(ts, period):
+    """Début de la période (epoch, secondes) contenant `ts` pour ce type de rapport."""
+    return bucket_start(to_epoch(ts), period)
+
+def to_datetime_utc(epochs):
+    """Colonne d'epochs -> datetime64[ns, UTC] (conversion vectorisée, sans parsing de texte)."""
+    return pd.to_datetime(epochs, unit="s", utc=True)
+
+# Upsert : même (symbol, period, bucket) -> mise à jour en place
+INSERT_MARKET_REPORT_SQL = '''
+    INSERT INTO market_reports 
+    (timestamp, symbol, period, price_open, price_close, price_high, price_low, volatility, max_drawdown, volume, bucket)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (symbol, period, bucket) DO UPDATE SET
+        timestamp = excluded.timestamp,
+        price_open = excluded.price_open,
+        price_close = excluded.price_close,
+        price_high = excluded.price_high,
+        price_low = excluded.price_low,
+        volatility = excluded.volatility,
+        max_drawdown = excluded.max_drawdown,
+        volume = excluded.volume
+'''
+
+def _report_row(data_dict, now):
+    ts = data_dict.get('timestamp')
+    ts = now if ts is None else to_epoch(ts)
+    return (
+        ts,
         data_dict['symbol'],
         data_dict['period'],
         data_dict['open'],
@@ -101,46 +410,229 @@ def log_market_report(data_dict):
         data_dict['low'],
         data_dict['volatility'],
         data_dict['max_drawdown'],
-        data_dict['volume']
-    ))
-    conn.commit()
-    conn.close()
+        data_dict['volume'],
+        bucket_start(ts, data_dict['period']),
+    )
+
+def log_market_reports(reports):
+    """
+    Enregistre un lot de rapports (dicts de calculate_metrics, 'timestamp'
+    optionnel, maintenant par défaut) en une seule transaction.
+    Renvoie le nombre de rapports écrits.
+    """
+    now = int(time.time())
+    rows = [_report_row(r, now) for r in reports if r]
+    if not rows:
+        return 0
+    with transaction() as conn:
+        conn.executemany(INSERT_MARKET_REPORT_SQL, rows)
+    return len(rows)
+
+def log_market_report(data_dict):
+    log_market_reports([data_dict])
+
+def _typed_timestamps(df, tz=None):
+    if "timestamp" in df.columns:
+        df["timestamp"] = to_datetime_utc(df["timestamp"])
+        if tz is not None:
+            df["timestamp"] = df["timestamp"].dt.tz_convert(tz)
+    return df
 
 def get_market_reports_db():
-    conn = sqlite3.connect(DB_NAME)
     try:
-        return pd.read_sql_query("SELECT * FROM market_reports ORDER BY id DESC", conn)
+        with get_connection() as conn:
+            return _typed_timestamps(pd.read_sql_query("SELECT * FROM market_reports ORDER BY id DESC", conn))
     except: return pd.DataFrame()
-    finally: conn.close()
+
+REPORT_COLUMNS = ("id", "timestamp", "symbol", "period", "price_open", "price_close",
+                  "price_high", "price_low", "volatility", "max_drawdown", "volume", "bucket")
+
+def _reports_where(symbol=None, periods=None, start=None, end=None):
+    """
+    Clause WHERE + paramètres. Le texte SQL ne dépend que des filtres présents
+    (et du nombre de périodes) : les requêtes préparées restent en cache.
+    """
+    clauses, params = [], []
+    if symbol:
+        clauses.append("symbol = ?")
+        params.append(symbol)
+    if periods:
+        periods = [periods] if isinstance(periods, str) else list(periods)
+        clauses.append(f"period IN ({', '.join('?' * len(periods))})")
+        params.extend(periods)
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(to_epoch(start))
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(to_epoch(end))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+def query_market_reports(symbol=None, periods=None, start=None, end=None,
+                         limit=None, offset=0, columns=None, tz=None):
+    """
+    Rapports filtrés côté SQL, du plus récent au plus ancien.
+
+    Parameters
+    ----------
+    symbol : str | None
+        Un seul ticker (None = tous).
+    periods : str | list | None
+        'HOURLY', 'DAILY', 'INSTANT' ou une liste de ces valeurs.
+    start, end : str | datetime | int | None
+        Plage [start, end) sur timestamp (epoch UTC ; voir to_epoch).
+    limit, offset : int
+        Pagination (LIMIT / OFFSET).
+    columns : list | None
+        Sous-ensemble de REPORT_COLUMNS (toutes par défaut).
+    tz : str | None
+        Fuseau de la colonne timestamp renvoyée (datetime64, UTC par défaut).
+    """
+    cols = [c for c in (columns or REPORT_COLUMNS) if c in REPORT_COLUMNS]
+    where, params = _reports_where(symbol, periods, start, end)
+    sql = f"SELECT {', '.join(cols)} FROM market_reports{where} ORDER BY timestamp DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params += [int(limit), int(offset)]
+    try:
+        with get_connection() as conn:
+            return _typed_timestamps(pd.read_sql_query(sql, conn, params=params), tz)
+    except: return pd.DataFrame(columns=cols)
+
+def scan_market_reports(symbol, periods=None, start=None, end=None,
+                        columns=("timestamp", "price_close"), tz=None):
+    """
+    Série chronologique (ordre croissant) d'un ticker sur [start, end), pour
+    les graphiques. Avec les colonnes par défaut, la lecture se fait
+    entièrement dans l'index couvrant (symbol, period, timestamp, price_close).
+    Renvoie un DataFrame indexé par timestamp (datetime64).
+    """
+    cols = [c for c in columns if c in REPORT_COLUMNS and c != "timestamp"]
+    where, params = _reports_where(symbol, periods, start, end)
+    sql = f"SELECT {', '.join(['timestamp'] + cols)} FROM market_reports{where} ORDER BY timestamp"
+    try:
+        with get_connection() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+    except: df = pd.DataFrame(columns=["timestamp"] + cols)
+    return _typed_timestamps(df, tz).set_index("timestamp")
+
+def count_market_reports(symbol=None, periods=None, start=None, end=None):
+    where, params = _reports_where(symbol, periods, start, end)
+    try:
+        with get_connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM market_reports{where}", params).fetchone()[0]
+    except: return 0
+
+def get_report_symbols():
+    """Tickers présents dans market_reports (lus depuis l'index, pas la table)."""
+    try:
+        with get_connection() as conn:
+            rows = conn.execute("SELECT DISTINCT symbol FROM market_reports ORDER BY symbol").fetchall()
+        return [row[0] for row in rows]
+    except: return []
 
 # --- SHARED PORTFOLIOS ---
-def save_portfolio_db(user_name, comment, tickers_str, years, rebal, stoploss, stats):
+_ALLOCATION_RE = re.compile(r"\s*([^,()]+?)\s*\(\s*([-\d.]+)\s*%\s*\)")
+
+def format_allocation(weights):
+    """{'AAPL': 0.5, 'MSFT': 0.5} -> "AAPL (50%), MSFT (50%)" (poids nuls ignorés)."""
+    return ", ".join(f"{t} ({w*100:.0f}%)" for t, w in weights.items() if w > 0)
+
+def parse_allocation(tickers_str):
+    """Inverse de format_allocation : "AAPL (50%), MSFT (50%)" -> {'AAPL': 0.5, 'MSFT': 0.5}."""
+    if not tickers_str:
+        return {}
+    return {sym: float(pct) / 100 for sym, pct in _ALLOCATION_RE.findall(tickers_str)}
+
+def save_portfolio_db(user_name, comment, weights, years, rebal, stoploss, stats):
     """
-    tickers_str: Chaîne déjà formatée (ex: "AAPL (50%), MSFT (50%)")
+    weights: {ticker: poids} (ou l'ancienne chaîne "AAPL (50%), MSFT (50%)").
+    La ligne du portefeuille et ses positions sont écrites dans la même transaction.
+    Renvoie l'id du portefeuille.
     """
-    conn = sqlite3.connect(DB_NAME)
-    now = datetime.now().strftime("%Y-%m-%d %H:%M")
-    conn.execute('''
-        INSERT INTO shared_portfolios 
-        (timestamp, user_name, comment, tickers, years, strategy_rebal, strategy_stoploss, total_return, volatility, sharpe)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        now, user_name, comment, tickers_str, years, rebal, stoploss, 
-        stats.get('Total Return', 0), stats.get('Volatility', 0), stats.get('Sharpe', 0)
-    ))
-    conn.commit()
-    conn.close()
+    if isinstance(weights, str):
+        weights = parse_allocation(weights)
+    holdings = [(t, float(w)) for t, w in weights.items() if w > 0]
+    now = int(time.time())
+    with transaction() as conn:
+        cur = conn.execute('''
+            INSERT INTO shared_portfolios 
+            (timestamp, user_name, comment, tickers, years, strategy_rebal, strategy_stoploss, total_return, volatility, sharpe)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            now, user_name, comment, format_allocation(weights), years, rebal, stoploss, 
+            stats.get('Total Return', 0), stats.get('Volatility', 0), stats.get('Sharpe', 0)
+        ))
+        portfolio_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO portfolio_holdings (portfolio_id, symbol, weight) VALUES (?, ?, ?)",
+            [(portfolio_id, t, w) for t, w in holdings],
+        )
+    return portfolio_id
 
 def get_latest_portfolios(limit=10):
-    conn = sqlite3.connect(DB_NAME)
     try:
-        return pd.read_sql_query(f"SELECT * FROM shared_portfolios ORDER BY id DESC LIMIT {limit}", conn)
+        with get_connection() as conn:
+            df = pd.read_sql_query("SELECT * FROM shared_portfolios ORDER BY id DESC LIMIT ?", conn, params=(int(limit),))
+        return _typed_timestamps(df)
     except: return pd.DataFrame()
-    finally: conn.close()
+
+# Tri autorisé pour get_top_portfolios (le nom de colonne n'est jamais pris de l'utilisateur)
+PORTFOLIO_METRICS = {
+    'sharpe': "sharpe DESC",
+    'total_return': "total_return DESC",
+    'volatility': "volatility ASC",
+}
+
+def get_portfolios_holding(symbol, min_weight=0.0, limit=10):
+    """Portefeuilles partagés contenant `symbol` (poids >= min_weight), du plus récent au plus ancien."""
+    try:
+        with get_connection() as conn:
+            df = pd.read_sql_query('''
+                SELECT p.*, h.weight AS holding_weight
+                FROM portfolio_holdings h JOIN shared_portfolios p ON p.id = h.portfolio_id
+                WHERE h.symbol = ? AND h.weight >= ?
+                ORDER BY p.id DESC LIMIT ?
+            ''', conn, params=(symbol, float(min_weight), int(limit)))
+        return _typed_timestamps(df)
+    except: return pd.DataFrame()
+
+def get_top_portfolios(metric='sharpe', symbol=None, limit=10):
+    """Meilleurs portefeuilles selon `metric` (voir PORTFOLIO_METRICS), éventuellement limités à ceux qui détiennent `symbol`."""
+    order = PORTFOLIO_METRICS[metric]
+    if symbol:
+        sql = f'''
+            SELECT p.* FROM shared_portfolios p
+            WHERE p.id IN (SELECT portfolio_id FROM portfolio_holdings WHERE symbol = ?)
+            ORDER BY {order} LIMIT ?
+        '''
+        params = (symbol, int(limit))
+    else:
+        sql = f"SELECT * FROM shared_portfolios ORDER BY {order} LIMIT ?"
+        params = (int(limit),)
+    try:
+        with get_connection() as conn:
+            return _typed_timestamps(pd.read_sql_query(sql, conn, params=params))
+    except: return pd.DataFrame()
+
+def get_portfolio_holdings(portfolio_id):
+    try:
+        with get_connection() as conn:
+            return pd.read_sql_query(
+                "SELECT symbol, weight FROM portfolio_holdings WHERE portfolio_id = ? ORDER BY weight DESC",
+                conn, params=(int(portfolio_id),))
+    except: return pd.DataFrame(columns=["symbol", "weight"])
+
+def get_held_symbols():
+    """Symboles présents dans au moins un portefeuille partagé."""
+    try:
+        with get_connection() as conn:
+            rows = conn.execute("SELECT DISTINCT symbol FROM portfolio_holdings ORDER BY symbol").fetchall()
+        return [row[0] for row in rows]
+    except: return []
 
 def delete_portfolio_db(item_id):
-    """Supprime un portfolio par son ID."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute("DELETE FROM shared_portfolios WHERE id = ?", (item_id,))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    """Supprime un portfolio par son ID (ses positions suivent : ON DELETE CASCADE)."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM shared_portfolios WHERE id = ?", (int(item_id),))
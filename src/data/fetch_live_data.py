@@ -5,36 +5,37 @@ Created on Thu Jan  1 12:39:01 2026
 @author: kylia
 """
 
-import yfinance as yf
-import pandas as pd
-from datetime import datetime
+from data.intraday_store import append_bars, last_timestamp, read_bars
+from data.market_data import get_provider
 
 # Liste des actifs que tu veux suivre
 TICKERS = ["^FCHI", "MC.PA", "AIR.PA"]  # CAC40, LVMH, Airbus
 
-def fetch_intraday_data():
+def fetch_intraday_data(tickers=TICKERS, interval="1m"):
     """
-    Récupère les données intraday (1 minute) du jour pour les tickers.
+    Récupère les données intraday (1 minute) du jour pour les tickers
+    et les ajoute au stockage intraday local (data.intraday_store) :
+    l'historique des collectes précédentes est conservé.
     """
-    data = yf.download(
-        tickers=" ".join(TICKERS),
-        period="1d",      # seulement la journée courante
-        interval="1m",    # résolution 1 minute
-        auto_adjust=True, # ajuste pour dividendes / splits
-        threads=True
+    bars = get_provider().get_bars_batch(
+        tickers,
+        period="1d",        # seulement la journée courante
+        interval=interval,  # résolution 1 minute
     )
+    if not bars:
+        print("Aucune donnée reçue.")
+        return {}
 
-    # On affiche les dernières lignes pour vérifier que ça marche
-    print("Dernières observations :")
-    print(data.tail())
+    added = {}
+    for t, df in bars.items():
+        added[t] = append_bars(t, df)
+        # On affiche l'heure du dernier point pour montrer que c'est 'live'
+        print(f"{t}: {added[t]} nouvelles barres, dernier timestamp : {last_timestamp(t)}")
 
-    # On affiche l'heure du dernier point pour montrer que c'est 'live'
-    last_timestamp = data.index[-1]
-    print("\nDernier timestamp reçu :", last_timestamp)
-
-    # Option : sauvegarder dans un CSV pour backtesting futur
-    data.to_csv("intraday_prices.csv")
-    print("\nDonnées sauvegardées dans intraday_prices.csv")
+    return added
 
 if __name__ == "__main__":
     fetch_intraday_data()
+
+    # Vérification : les dernières barres 5 minutes du premier ticker, relues depuis le stockage
+    print(read_bars(TICKERS[0], resample="5m", tz="Europe/Paris").tail())
@@ -0,0 +1,176 @@
+"""
+Stockage local des barres intraday, en ajout seulement.
+
+Une partition Parquet compressée (zstd) par symbole et par jour UTC :
+`<INTRADAY_DIR>/<symbole encodé>/<YYYY-MM-DD>.parquet`. Chaque collecte
+complète la partition du jour sans réécrire l'historique ; une lecture sur
+une plage de dates n'ouvre que les partitions concernées, et les barres
+peuvent être ré-échantillonnées à la volée (5m, 1h, 1d...).
+
+Alimenté par la collecte live (barres 1 minute, `fetch_live_data`) et par
+le job planifié (barres horaires, `jobs.job_scheduler`), qui n'y télécharge
+que les barres postérieures à la dernière stockée.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from datetime import date
+from urllib.parse import unquote
+
+import pandas as pd
+
+from data.market_data import OHLCV_COLUMNS
+from data.price_cache import safe_symbol
+
+# Même logique que DB_NAME : volume Fly.io ou dossier local
+if os.path.exists("/data"):
+    INTRADAY_DIR = "/data/intraday"
+else:
+    INTRADAY_DIR = "intraday_store"
+
+COMPRESSION = "zstd"
+
+# Alias acceptés pour `resample` -> règle pandas
+RESAMPLE_RULES = {
+    "1m": "1min", "5m": "5min", "15m": "15min", "30m": "30min",
+    "60m": "1h", "1h": "1h", "4h": "4h", "1d": "1D",
+}
+
+_OHLCV_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+_write_lock = threading.Lock()
+
+
+def store_root(interval: str = "1m", root=None) -> str:
+    """
+    Racine du stockage pour une résolution : les barres 1 minute (collecte
+    live) à la racine, les autres dans `<racine>_<interval>`, pour ne jamais
+    mélanger deux résolutions dans une partition.
+    """
+    root = root or INTRADAY_DIR
+    return root if interval == "1m" else f"{root}_{interval}"
+
+
+def _symbol_dir(symbol: str, root=None) -> str:
+    return os.path.join(root or INTRADAY_DIR, safe_symbol(symbol))
+
+
+def _to_utc_index(bars: pd.DataFrame) -> pd.DataFrame:
+    bars = bars.copy()
+    idx = pd.DatetimeIndex(bars.index)
+    bars.index = idx.tz_localize("UTC") if idx.tz is None else idx.tz_convert("UTC")
+    bars.index.name = "Date"
+    return bars
+
+
+def append_bars(symbol: str, bars: pd.DataFrame, root=None) -> int:
+    """
+    Ajoute des barres (index horodaté ; sans fuseau = UTC) au stockage.
+    Une barre déjà présente au même horodatage est remplacée par la plus
+    récente (barre encore en formation lors de la collecte précédente).
+    Renvoie le nombre de nouvelles barres.
+    """
+    if bars is None or bars.empty:
+        return 0
+    cols = [c for c in OHLCV_COLUMNS if c in bars.columns]
+    bars = _to_utc_index(bars[cols]).sort_index()
+    folder = _symbol_dir(symbol, root)
+    os.makedirs(folder, exist_ok=True)
+
+    added = 0
+    with _write_lock:
+        for day, chunk in bars.groupby(bars.index.date):
+            path = os.path.join(folder, f"{day.isoformat()}.parquet")
+            if os.path.exists(path):
+                existing = pd.read_parquet(path)
+                new_rows = int((~chunk.index.isin(existing.index)).sum())
+                merged = pd.concat([existing, chunk])
+                merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+                if new_rows == 0 and merged.equals(existing):
+                    continue  # rien de neuf : on ne réécrit pas la partition
+            else:
+                new_rows = len(chunk)
+                merged = chunk
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            merged.to_parquet(tmp_path, compression=COMPRESSION)
+            os.replace(tmp_path, path)
+            added += new_rows
+    return added
+
+
+def list_days(symbol: str, root=None) -> list:
+    """Jours (date) disponibles pour un symbole, triés."""
+    folder = _symbol_dir(symbol, root)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(date.fromisoformat(f[:-8]) for f in os.listdir(folder) if f.endswith(".parquet"))
+
+
+def list_symbols(root=None) -> list:
+    root = root or INTRADAY_DIR
+    if not os.path.isdir(root):
+        return []
+    return sorted(unquote(d) for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+
+
+def read_bars(symbol: str, start=None, end=None, resample=None, tz=None, root=None) -> pd.DataFrame:
+    """
+    Lit les barres de [start, end) en n'ouvrant que les partitions concernées.
+
+    Parameters
+    ----------
+    start, end : date | str | Timestamp | None
+        Bornes (sans fuseau = UTC). None = pas de borne.
+    resample : str | None
+        '5m', '15m', '1h', '1d'... (voir RESAMPLE_RULES) ; agrégation OHLCV.
+    tz : str | None
+        Fuseau de l'index renvoyé (UTC par défaut), ex: 'Europe/Paris'.
+    """
+    lo = _bound(start)
+    hi = _bound(end)
+
+    days = list_days(symbol, root)
+    if lo is not None:
+        days = [d for d in days if d >= lo.date()]
+    if hi is not None:
+        days = [d for d in days if d <= hi.date()]
+    if not days:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    folder = _symbol_dir(symbol, root)
+    bars = pd.concat([pd.read_parquet(os.path.join(folder, f"{d.isoformat()}.parquet")) for d in days])
+    bars = bars.sort_index()
+    if lo is not None:
+        bars = bars[bars.index >= lo]
+    if hi is not None:
+        bars = bars[bars.index < hi]
+
+    # Conversion avant agrégation : les barres '1d' suivent les jours du fuseau demandé
+    if tz is not None:
+        bars.index = bars.index.tz_convert(tz)
+
+    if resample is not None:
+        rule = RESAMPLE_RULES.get(resample, resample)
+        agg = {c: f for c, f in _OHLCV_AGG.items() if c in bars.columns}
+        bars = bars.resample(rule).agg(agg).dropna(subset=["Close"])
+    bars.index.name = "Date"
+    return bars
+
+
+def last_timestamp(symbol: str, root=None):
+    """Horodatage (UTC) de la dernière barre stockée, ou None."""
+    days = list_days(symbol, root)
+    if not days:
+        return None
+    last = pd.read_parquet(os.path.join(_symbol_dir(symbol, root), f"{days[-1].isoformat()}.parquet"))
+    return last.index.max() if not last.empty else None
+
+
+def _bound(value):
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
@@ -0,0 +1,248 @@
+"""
+Couche d'accès aux données de marché.
+
+Tous les modules passent par `get_provider()` au lieu d'appeler
+`yf.download` directement. Deux implémentations :
+
+- `YFinanceProvider` : téléchargement Yahoo Finance (par défaut) ;
+- `ReplayProvider`   : relit des barres enregistrées sur disque
+  (`<root>/<interval>/<ticker>.parquet` ou `.csv`), sans réseau.
+
+Le provider est choisi via la variable d'environnement
+`MARKET_DATA_PROVIDER` ('yfinance' ou 'replay', dossier dans
+`MARKET_DATA_REPLAY_DIR`) ou remplacé à chaud avec `set_provider()`
+(benchmarks, tests de charge).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from data.price_cache import safe_symbol
+
+# Colonnes OHLCV normalisées renvoyées par tous les providers
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def normalize_bars(raw: pd.DataFrame) -> pd.DataFrame:
+    """Garde les colonnes OHLCV, trie l'index et le nomme 'Date'."""
+    cols = [c for c in OHLCV_COLUMNS if c in raw.columns]
+    bars = raw[cols].dropna(how="all").copy()
+    bars = bars.sort_index()
+    bars.index.name = "Date"
+    return bars
+
+
+class MarketDataProvider(ABC):
+    """
+    Interface commune des sources de prix.
+
+    Les fenêtres s'expriment soit par `start`/`end` (dates, `end` exclu),
+    soit par `period` au format Yahoo ('1d', '5d', '1mo', '1y', 'max'...).
+    Les barres sont toujours ajustées (dividendes / splits).
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get_bars_batch(self, tickers, start=None, end=None, period=None, interval="1d"):
+        """
+        Renvoie {ticker: DataFrame OHLCV}. Les tickers sans données sont
+        absents du dictionnaire (jamais d'exception pour un seul ticker vide).
+        """
+
+    def get_bars(self, ticker, start=None, end=None, period=None, interval="1d") -> pd.DataFrame:
+        """Barres OHLCV d'un seul ticker (DataFrame vide si aucune donnée)."""
+        bars = self.get_bars_batch([ticker], start=start, end=end, period=period, interval=interval)
+        return bars.get(ticker, pd.DataFrame(columns=OHLCV_COLUMNS))
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Téléchargement Yahoo Finance (une seule requête groupée par appel)."""
+
+    name = "yfinance"
+
+    def get_bars_batch(self, tickers, start=None, end=None, period=None, interval="1d"):
+        import yfinance as yf
+
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return {}
+
+        kwargs = {"interval": interval}
+        if start is not None:
+            kwargs["start"] = start
+            if end is not None:
+                kwargs["end"] = end
+        elif period is not None:
+            kwargs["period"] = period
+
+        raw = yf.download(
+            tickers,
+            group_by="ticker",
+            auto_adjust=True,  # ajuste pour dividendes / splits
+            progress=False,
+            threads=True,
+            **kwargs,
+        )
+        if raw is None or raw.empty:
+            return {}
+
+        out = {}
+        for t in tickers:
+            # yfinance renvoie (Ticker, Price) avec group_by='ticker',
+            # parfois (Price, Ticker), ou des colonnes plates (anciennes versions)
+            if isinstance(raw.columns, pd.MultiIndex):
+                if t in raw.columns.get_level_values(0):
+                    sub = raw[t]
+                elif t in raw.columns.get_level_values(1):
+                    sub = raw.xs(t, level=1, axis=1)
+                else:
+                    continue
+            elif len(tickers) == 1:
+                sub = raw
+            else:
+                continue
+
+            bars = normalize_bars(sub)
+            if not bars.empty:
+                out[t] = bars
+        return out
+
+
+def _period_start(index: pd.DatetimeIndex, period: str):
+    """Début de fenêtre pour un `period` Yahoo, relatif à la dernière barre."""
+    last = index[-1]
+    if period == "max":
+        return index[0]
+    if period == "ytd":
+        return last.normalize().replace(month=1, day=1)
+    if period.endswith("d"):
+        # 'Nd' = les N dernières séances présentes dans les données
+        days = pd.Index(index.normalize().unique())
+        n = int(period[:-1])
+        return days[-n] if n <= len(days) else days[0]
+    if period.endswith("mo"):
+        return last - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"):
+        return last - pd.DateOffset(years=int(period[:-1]))
+    raise ValueError(f"Unsupported period {period!r}")
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Relit des barres enregistrées localement (aucun accès réseau).
+
+    Arborescence : `<root>/<interval>/<ticker encodé>.parquet` (ou `.csv`).
+    Les `period` sont interprétés par rapport à la dernière barre enregistrée,
+    pour que le rejeu soit déterministe quel que soit le jour de lancement.
+    """
+
+    name = "replay"
+
+    def __init__(self, root: str):
+        self.root = root
+        self._frames: dict[tuple[str, str], pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, ticker: str, interval: str) -> pd.DataFrame | None:
+        key = (ticker, interval)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+
+        base = os.path.join(self.root, interval, safe_symbol(ticker))
+        if os.path.exists(base + ".parquet"):
+            frame = pd.read_parquet(base + ".parquet")
+        elif os.path.exists(base + ".csv"):
+            frame = pd.read_csv(base + ".csv", index_col=0, parse_dates=True)
+        else:
+            frame = None
+        if frame is not None:
+            frame = normalize_bars(frame)
+
+        with self._lock:
+            self._frames[key] = frame
+        return frame
+
+    def get_bars_batch(self, tickers, start=None, end=None, period=None, interval="1d"):
+        out = {}
+        for t in dict.fromkeys(tickers):
+            bars = self._load(t, interval)
+            if bars is None or bars.empty:
+                continue
+
+            if start is not None:
+                lo = pd.Timestamp(start)
+                hi = pd.Timestamp(end) if end is not None else None
+                tz = getattr(bars.index, "tz", None)
+                if tz is not None:
+                    lo = lo.tz_localize(tz)
+                    hi = hi.tz_localize(tz) if hi is not None else None
+                mask = bars.index >= lo
+                if hi is not None:
+                    mask &= bars.index < hi
+                bars = bars[mask]
+            elif period is not None:
+                bars = bars[bars.index >= _period_start(bars.index, period)]
+
+            if not bars.empty:
+                out[t] = bars.copy()
+        return out
+
+
+def write_replay_bars(root: str, ticker: str, bars: pd.DataFrame, interval: str = "1d") -> str:
+    """Enregistre des barres au format lu par `ReplayProvider`."""
+    folder = os.path.join(root, interval)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{safe_symbol(ticker)}.parquet")
+    normalize_bars(bars).to_parquet(path)
+    return path
+
+
+def record_bars(tickers, root: str, period: str = "max", interval: str = "1d", provider=None) -> list:
+    """
+    Enregistre l'historique de `tickers` depuis un provider (Yahoo par défaut)
+    pour pouvoir le rejouer ensuite hors-ligne. Renvoie les tickers enregistrés.
+    """
+    provider = provider or YFinanceProvider()
+    bars = provider.get_bars_batch(tickers, period=period, interval=interval)
+    for t, df in bars.items():
+        write_replay_bars(root, t, df, interval)
+    return list(bars)
+
+
+_provider: MarketDataProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> MarketDataProvider:
+    """Provider actif du processus (construit au premier appel depuis l'environnement)."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            kind = os.environ.get("MARKET_DATA_PROVIDER", "yfinance").lower()
+            if kind == "replay":
+                _provider = ReplayProvider(os.environ.get("MARKET_DATA_REPLAY_DIR", "replay_data"))
+            elif kind == "yfinance":
+                _provider = YFinanceProvider()
+            else:
+                raise ValueError(f"Unknown MARKET_DATA_PROVIDER {kind!r}")
+        return _provider
+
+
+def set_provider(provider: MarketDataProvider | None) -> None:
+    """Remplace le provider actif (None = revenir à la configuration par défaut)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+if __name__ == "__main__":
+    # Enregistre quelques tickers pour un rejeu hors-ligne
+    saved = record_bars(["^FCHI", "^GSPC", "NVDA", "BTC-USD"], "replay_data", period="10y")
+    print(f"Recorded {len(saved)} tickers into replay_data/1d: {saved}")
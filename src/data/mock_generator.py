@@ -1,8 +1,58 @@
-import sqlite3
 import pandas as pd
 import numpy as np
-import yfinance as yf
-from data.database import DB_NAME, get_active_tickers_db
+from data.database import get_active_tickers_db, transaction, log_market_reports
+from data.market_data import get_provider
+
+DEFAULT_TICKERS = ["AAPL", "BTC-USD", "EURUSD=X", "GC=F"]
+
+def _range_metrics(df):
+    # Volatility: (High - Low) / Open ; Drawdown: (Low - High) / High
+    vol = ((df['high'] - df['low']) / df['open']).where(df['open'] > 0, 0.0)
+    dd = ((df['low'] - df['high']) / df['high']).where(df['high'] > 0, 0.0)
+    return vol, dd
+
+def build_mock_reports(ticker, bars):
+    """
+    HOURLY + DAILY report rows for one ticker, in one vectorized pass.
+    Returns a DataFrame with the log_market_reports columns ('timestamp' as epoch UTC).
+    """
+    if bars is None or bars.empty:
+        return pd.DataFrame()
+
+    # Times rounded to the hour (HH:00)
+    clean_ts = bars.index.floor("h")
+    hourly = pd.DataFrame({
+        'timestamp': clean_ts,
+        'open': bars['Open'].to_numpy(dtype=float),
+        'close': bars['Close'].to_numpy(dtype=float),
+        'high': bars['High'].to_numpy(dtype=float),
+        'low': bars['Low'].to_numpy(dtype=float),
+        'volume': bars['Volume'].fillna(0).to_numpy().astype(np.int64),
+    })
+    hourly['volatility'], hourly['max_drawdown'] = _range_metrics(hourly)
+    hourly['period'] = 'HOURLY'
+
+    # DAILY: Open of the first candle, Close of the last, true day High/Low,
+    # summed volume ; stamped at the last candle of the day
+    daily = hourly.groupby(bars.index.date, sort=True).agg(
+        timestamp=('timestamp', 'last'),
+        open=('open', 'first'),
+        close=('close', 'last'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        volume=('volume', 'sum'),
+    ).reset_index(drop=True)
+    daily['volatility'], daily['max_drawdown'] = _range_metrics(daily)
+    daily['period'] = 'DAILY'
+
+    out = pd.concat([hourly, daily], ignore_index=True)
+    out['symbol'] = ticker
+    # Epoch UTC (index avec fuseau : conversion exacte, sans parsing)
+    ts = pd.DatetimeIndex(out['timestamp'])
+    if ts.tz is None:
+        ts = ts.tz_localize("UTC")
+    out['timestamp'] = (ts.tz_convert("UTC").tz_localize(None) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    return out
 
 def reset_and_fill_mock_data():
     """
@@ -11,112 +61,45 @@ def reset_and_fill_mock_data():
     - Times rounded to the hour (HH:00).
     - Aggregated DAILY report (Sum of volume, true Day High/Low).
     """
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # 1. CLEAR TABLE
-    c.execute("DELETE FROM market_reports")
-    c.execute("DELETE FROM sqlite_sequence WHERE name='market_reports'")
-    conn.commit()
-    
     tickers = get_active_tickers_db()
     if not tickers:
-        tickers = ["AAPL", "BTC-USD", "EURUSD=X", "GC=F"]
-        for t in tickers:
-             c.execute("INSERT OR IGNORE INTO active_tickers (symbol) VALUES (?)", (t,))
-        conn.commit()
+        tickers = DEFAULT_TICKERS
+        with transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO active_tickers (symbol) VALUES (?)", [(t,) for t in tickers])
 
-    all_entries = []
-    
     print("Downloading mock data (10 days)...")
-    
-    for t in tickers:
-        try:
-            # Fetch 10 days of hourly data
-            df = yf.download(t, period="10d", interval="60m", progress=False)
-            if df.empty: continue
-            
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
-            
-            # Helper column for grouping by day
-            df['day_str'] = df.index.date
-            
-            # Get indices of the last rows for each day group
-            last_indices = df.groupby('day_str').apply(lambda x: x.index[-1]).tolist()
-            
-            for idx, row in df.iterrows():
-                clean_ts = idx.replace(minute=0, second=0, microsecond=0)
-                ts_str = clean_ts.strftime("%Y-%m-%d %H:%M:%S")
-                
-                # --- HOURLY ENTRY ---
-                # Simulated Metrics for the hour
-                h_open = float(row['Open'])
-                h_close = float(row['Close'])
-                h_high = float(row['High'])
-                h_low = float(row['Low'])
-                h_vol = int(row['Volume'])
-                
-                # Hourly volatility is small (noise)
-                h_volatility = (h_high - h_low) / h_open if h_open > 0 else 0.0
-                h_dd = (h_low - h_high) / h_high if h_high > 0 else 0.0
 
-                params_hourly = (
-                    ts_str, t, 'HOURLY',
-                    h_open, h_close, h_high, h_low,
-                    h_volatility, h_dd, h_vol
-                )
-                all_entries.append((clean_ts, params_hourly))
-                
-                # --- DAILY ENTRY (Aggregation) ---
-                if idx in last_indices:
-                    # Filter data for the entire day
-                    day_df = df[df['day_str'] == row['day_str']]
-                    
-                    # 1. Open = Open of the FIRST candle of the day
-                    d_open = float(day_df['Open'].iloc[0])
-                    
-                    # 2. Close = Close of the LAST candle (current row)
-                    d_close = float(row['Close'])
-                    
-                    # 3. High/Low = Extremes of the day
-                    d_high = float(day_df['High'].max())
-                    d_low = float(day_df['Low'].min())
-                    
-                    # 4. Volume = Sum of the day
-                    d_volume = int(day_df['Volume'].sum())
-                    
-                    # 5. Volatility & Drawdown calculated on the full day range
-                    d_volatility = (d_high - d_low) / d_open if d_open > 0 else 0.0
-                    d_dd = (d_low - d_high) / d_high if d_high > 0 else 0.0
-                    
-                    params_daily = (
-                        ts_str, t, 'DAILY',
-                        d_open, d_close, d_high, d_low,
-                        d_volatility, d_dd, d_volume
-                    )
-                    all_entries.append((clean_ts, params_daily))
+    # One batched download for all tickers (10 days of hourly data)
+    try:
+        bars_by_ticker = get_provider().get_bars_batch(tickers, period="10d", interval="60m")
+    except Exception as e:
+        print(f"Error downloading mock data: {e}")
+        bars_by_ticker = {}
 
+    frames = []
+    for t in tickers:
+        try:
+            frames.append(build_mock_reports(t, bars_by_ticker.get(t)))
         except Exception as e:
             print(f"Error generating {t}: {e}")
 
-    # GLOBAL SORT
-    all_entries.sort(key=lambda x: x[0])
-    
+    frames = [f for f in frames if not f.empty]
+    if frames:
+        # GLOBAL SORT (stable : à heure égale, HOURLY avant DAILY)
+        all_entries = pd.concat(frames, ignore_index=True).sort_values('timestamp', kind='stable')
+    else:
+        all_entries = pd.DataFrame()
+
     print(f"Inserting {len(all_entries)} sorted records...")
-    
-    sql_data = [x[1] for x in all_entries]
-    
-    c.executemany('''
-        INSERT INTO market_reports 
-        (timestamp, symbol, period, price_open, price_close, price_high, price_low, volatility, max_drawdown, volume)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', sql_data)
-    
-    conn.commit()
-    conn.close()
-    
+
+    # CLEAR TABLE + bulk insert in one transaction: the dashboard never sees an empty table
+    with transaction() as conn:
+        conn.execute("DELETE FROM market_reports")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name='market_reports'")
+        conn.execute("DELETE FROM rollup_state")
+        log_market_reports(all_entries.to_dict('records'))
+
     return len(all_entries), f"Generated {len(all_entries)} reports (Hourly & Daily aggregated)."
 
 if __name__ == "__main__":
-    reset_and_fill_mock_data()
\ No newline at end of file
+    reset_and_fill_mock_data()
@@ -0,0 +1,130 @@
+"""
+Cache disque des barres OHLCV (un fichier Parquet par ticker et par intervalle).
+
+Le cache est stocké sur le volume persistant `/data` (Fly.io) quand il existe,
+sinon dans un dossier local. Chaque fichier garde en métadonnées la fenêtre
+déjà couverte (`coverage_start` / `fetched_until`) pour que
+`data_single_asset.get_price_history` ne télécharge que les barres manquantes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Même logique que DB_NAME : volume Fly.io ou dossier local
+if os.path.exists("/data"):
+    CACHE_DIR = "/data/price_cache"
+else:
+    CACHE_DIR = "price_cache"
+
+_META_KEY = b"price_cache"
+
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def safe_symbol(ticker: str) -> str:
+    """Encode un ticker Yahoo ('^FCHI', 'EURUSD=X') en nom de fichier sûr."""
+    return quote(ticker, safe="")
+
+
+def cache_path(ticker: str, interval: str = "1d", source: str = "yfinance") -> str:
+    """Un sous-dossier par provider : des barres rejouées ne se mélangent pas à Yahoo."""
+    return os.path.join(CACHE_DIR, source, interval, f"{safe_symbol(ticker)}.parquet")
+
+
+def cache_lock(ticker: str, interval: str = "1d", source: str = "yfinance") -> threading.Lock:
+    """Verrou par fichier : évite que deux threads réécrivent le même cache."""
+    path = cache_path(ticker, interval, source)
+    with _locks_guard:
+        if path not in _locks:
+            _locks[path] = threading.Lock()
+        return _locks[path]
+
+
+def read_cached_bars(ticker: str, interval: str = "1d", source: str = "yfinance"):
+    """
+    Lit les barres en cache.
+
+    Returns
+    -------
+    (bars, meta) : (pd.DataFrame | None, dict)
+        `bars` est None si rien n'est en cache (ou fichier illisible).
+        `meta` contient 'coverage_start' et 'fetched_until' (dates ISO).
+    """
+    path = cache_path(ticker, interval, source)
+    if not os.path.exists(path):
+        return None, {}
+    try:
+        table = pq.read_table(path)
+    except Exception:
+        # Fichier corrompu (écriture interrompue) : on repartira de zéro
+        return None, {}
+
+    raw_meta = (table.schema.metadata or {}).get(_META_KEY)
+    meta = json.loads(raw_meta) if raw_meta else {}
+    bars = table.to_pandas()
+    if bars.empty or "coverage_start" not in meta:
+        return None, {}
+    return bars, meta
+
+
+def write_cached_bars(
+    ticker: str, interval: str, bars: pd.DataFrame, meta: dict, source: str = "yfinance"
+) -> None:
+    """Écrit le cache de façon atomique (fichier temporaire puis os.replace)."""
+    path = cache_path(ticker, interval, source)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    table = pa.Table.from_pandas(bars, preserve_index=True)
+    schema_meta = dict(table.schema.metadata or {})
+    schema_meta[_META_KEY] = json.dumps(meta).encode()
+    table = table.replace_schema_metadata(schema_meta)
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def merge_bars(cached: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+    """Ajoute les nouvelles barres ; en cas de doublon, la barre récente gagne."""
+    merged = pd.concat([cached, fresh])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def overlap_is_consistent(cached: pd.DataFrame, fresh: pd.DataFrame, rtol: float = 1e-6) -> bool:
+    """
+    Vérifie que les barres communes ont les mêmes clôtures.
+
+    Avec auto_adjust=True, Yahoo réajuste tout l'historique après un dividende
+    ou un split : dans ce cas les anciennes barres ne sont plus comparables et
+    il faut retélécharger la fenêtre complète. La dernière barre du cache est
+    ignorée car elle peut être encore en cours (intraday).
+    """
+    common = cached.index[:-1].intersection(fresh.index)
+    if common.empty:
+        return True
+    old = cached.loc[common, "Close"].astype(float)
+    new = fresh.loc[common, "Close"].astype(float)
+    diff = (old - new).abs() / old.abs().where(old != 0, 1.0)
+    return bool((diff.fillna(0.0) <= rtol).all())
+
+
+def clear_cache(ticker: str | None = None, interval: str = "1d", source: str = "yfinance") -> None:
+    """Supprime le cache d'un ticker (ou de tous les tickers de l'intervalle)."""
+    if ticker is not None:
+        paths = [cache_path(ticker, interval, source)]
+    else:
+        folder = os.path.join(CACHE_DIR, source, interval)
+        paths = [os.path.join(folder, f) for f in os.listdir(folder)] if os.path.isdir(folder) else []
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
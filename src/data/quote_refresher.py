@@ -0,0 +1,122 @@
+"""
+Rafraîchissement des cotations du bandeau (ticker tape) en arrière-plan.
+
+Un thread unique par processus télécharge les derniers prix des tickers
+suivis à intervalle fixe et les garde dans une table partagée
+{ticker: (prix, horodatage)}. Les pages Streamlit lisent cette table
+instantanément au lieu d'appeler Yahoo à chaque rerun.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from data.data_loader import get_live_prices_batch
+
+# Période de rafraîchissement (secondes) : une requête par période, quel que
+# soit le nombre de sessions ouvertes
+REFRESH_SECONDS = 60.0
+
+# Un ticker qu'aucune session n'a demandé depuis ce délai n'est plus rafraîchi
+IDLE_TTL_SECONDS = 15 * 60.0
+
+
+class QuoteRefresher:
+    def __init__(self, interval=REFRESH_SECONDS, idle_ttl=IDLE_TTL_SECONDS, fetch=get_live_prices_batch):
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._quotes = {}    # ticker -> (prix, time.time() de la mise à jour)
+        self._watched = {}   # ticker -> dernière demande par une session
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="quote-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def watch(self, tickers):
+        """Déclare les tickers affichés ; un ticker jamais vu déclenche un rafraîchissement immédiat."""
+        now = time.time()
+        with self._lock:
+            unknown = False
+            for t in tickers:
+                self._watched[t] = now
+                unknown |= t not in self._quotes
+        if unknown:
+            self._wake.set()
+
+    def snapshot(self, tickers):
+        """
+        Lecture instantanée de la table.
+        Renvoie {ticker: (prix, âge en secondes)} ; (None, None) si jamais reçu.
+        """
+        now = time.time()
+        with self._lock:
+            out = {}
+            for t in tickers:
+                if t in self._quotes:
+                    price, ts = self._quotes[t]
+                    out[t] = (price, now - ts)
+                else:
+                    out[t] = (None, None)
+            return out
+
+    def refresh_now(self):
+        """Télécharge les tickers suivis (un seul appel groupé) et met la table à jour."""
+        now = time.time()
+        with self._lock:
+            # On oublie les tickers que plus aucune session n'affiche
+            for t in [t for t, seen in self._watched.items() if now - seen > self.idle_ttl]:
+                del self._watched[t]
+            tickers = sorted(self._watched)
+        if not tickers:
+            return 0
+
+        prices = self._fetch(tickers)
+        fetched_at = time.time()
+        updated = 0
+        with self._lock:
+            for t in tickers:
+                price = prices.get(t, 0.0)
+                # 0.0 = échec de téléchargement : on garde l'ancien prix (son âge augmente)
+                if price and price > 0:
+                    self._quotes[t] = (float(price), fetched_at)
+                    updated += 1
+        return updated
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.refresh_now()
+            except Exception as e:
+                print(f"Quote refresh failed: {e}")
+            self._wake.wait(self.interval)
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_quote_refresher() -> QuoteRefresher:
+    """Refresher partagé du processus, démarré au premier appel."""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = QuoteRefresher()
+            _refresher.start()
+        return _refresher
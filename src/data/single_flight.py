@@ -0,0 +1,64 @@
+"""
+Coalescence des téléchargements concurrents ("single-flight").
+
+Streamlit exécute chaque session dans un thread du même processus : quand
+plusieurs sessions demandent en même temps les mêmes prix, un seul appel
+réseau part (le "leader"), les autres attendent son résultat et le
+partagent. Une fois l'appel terminé la clé est libérée : ce n'est pas un
+cache, seulement un dédoublonnage des appels en vol.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Exécute au plus un appel en vol par clé ; les appels concurrents partagent son résultat."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict = {}
+        # Compteurs simples pour vérifier l'effet en charge
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Appelle `fn(*args, **kwargs)`, sauf si un appel avec la même `key` est
+        déjà en cours : on attend alors ce dernier et on renvoie le même
+        résultat (ou on relève la même exception).
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+
+# Instance partagée par tous les téléchargements de prix du processus
+price_fetches = SingleFlight()
@@ -0,0 +1,305 @@
+"""
+Générateur de marché synthétique, déterministe et hors-ligne.
+
+Sert aux benchmarks (backtests, optimiseur, pages du dashboard) sur des
+volumes bien plus gros que l'univers réel, sans appel réseau :
+
+- trajectoires GBM avec volatilité GARCH(1,1) et sauts (Poisson) ;
+- actifs corrélés via un modèle à facteurs (marché, région, crypto) ;
+- calendriers mixtes : actions US / Europe (jours ouvrés + quelques jours
+  fériés), crypto 7j/7, Forex du lundi au vendredi ;
+- barres intraday (pont brownien entre l'ouverture et la clôture du jour).
+
+La génération se fait par paquets de tickers (mémoire bornée). Chaque ticker
+a ses propres générateurs `default_rng([seed, i, flux])` et les facteurs sont
+communs : le résultat ne dépend ni de la taille des paquets ni du nombre de
+tickers générés avant lui.
+
+Sorties : un jeu de données lu par `ReplayProvider` (MARKET_DATA_PROVIDER=replay,
+MARKET_DATA_REPLAY_DIR=<dossier>) et des rapports dans market_reports.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.market_data import write_replay_bars
+
+# Classes d'actifs : proportion dans l'univers, suffixe du symbole, paramètres annuels
+ASSET_CLASSES = {
+    "equity_us": {"weight": 0.5, "suffix": "", "mu": 0.07, "vol": (0.18, 0.45), "jumps": 2.0,
+                  "tz": "America/New_York", "session": ("09:30", 7), "gap": 0.25},
+    "equity_eu": {"weight": 0.3, "suffix": ".PA", "mu": 0.06, "vol": (0.16, 0.40), "jumps": 2.0,
+                  "tz": "Europe/Paris", "session": ("09:00", 9), "gap": 0.25},
+    "crypto": {"weight": 0.1, "suffix": "-USD", "mu": 0.20, "vol": (0.55, 1.00), "jumps": 6.0,
+               "tz": "UTC", "session": ("00:00", 24), "gap": 0.0},
+    "fx": {"weight": 0.1, "suffix": "=X", "mu": 0.0, "vol": (0.05, 0.12), "jumps": 1.0,
+           "tz": "UTC", "session": ("00:00", 24), "gap": 0.0},
+}
+
+# Jours fériés fixes (mois, jour) par calendrier
+HOLIDAYS = {
+    "equity_us": [(1, 1), (7, 4), (12, 25)],
+    "equity_eu": [(1, 1), (5, 1), (12, 25), (12, 26)],
+}
+
+# Facteurs communs : volatilité journalière (jours calendaires)
+FACTORS = ("market", "us", "eu", "crypto")
+FACTOR_VOL = np.array([0.010, 0.004, 0.004, 0.030])
+
+GARCH_ALPHA = 0.08
+GARCH_BETA = 0.90
+
+# Pas du pont brownien par séance pour les High/Low journaliers
+DAILY_BRIDGE_STEPS = 16
+# Sous-pas par barre intraday
+INTRADAY_SUBSTEPS = 4
+
+CHUNK_SIZE = 100
+
+
+# Flux aléatoires indépendants par ticker
+STREAM_PARAMS, STREAM_RETURNS, STREAM_DAILY, STREAM_INTRADAY = range(4)
+
+
+def _ticker_rng(seed, i, stream=STREAM_PARAMS):
+    return np.random.default_rng([seed, i, stream])
+
+
+def make_universe(n_tickers, seed=42) -> pd.DataFrame:
+    """
+    Univers synthétique : symbole, classe d'actif, drift, volatilité annuelle,
+    expositions aux facteurs, prix initial et volume moyen.
+    """
+    classes = list(ASSET_CLASSES)
+    probs = np.array([ASSET_CLASSES[c]["weight"] for c in classes])
+    rows = []
+    for i in range(n_tickers):
+        rng = _ticker_rng(seed, i)
+        cls = classes[rng.choice(len(classes), p=probs / probs.sum())]
+        spec = ASSET_CLASSES[cls]
+        betas = np.zeros(len(FACTORS))
+        if cls.startswith("equity"):
+            betas[0] = rng.uniform(0.6, 1.4)
+            betas[1 if cls == "equity_us" else 2] = rng.uniform(0.5, 1.5)
+        elif cls == "crypto":
+            betas[0] = rng.uniform(0.2, 0.6)
+            betas[3] = rng.uniform(0.7, 1.3)
+        else:
+            betas[0] = rng.uniform(-0.2, 0.2)
+        rows.append({
+            "Symbol": f"SYN{i:05d}{spec['suffix']}",
+            "asset_class": cls,
+            "mu": spec["mu"] + rng.normal(0, 0.03),
+            "vol": rng.uniform(*spec["vol"]),
+            "betas": betas,
+            "price0": float(np.exp(rng.uniform(np.log(5), np.log(500)))) if cls != "fx" else rng.uniform(0.5, 2.0),
+            "volume0": float(np.exp(rng.normal(13, 1.5))),
+        })
+    return pd.DataFrame(rows)
+
+
+def trading_days(calendar, days: pd.DatetimeIndex) -> np.ndarray:
+    """Masque des séances d'un calendrier sur un axe de jours calendaires."""
+    if calendar == "crypto":
+        return np.ones(len(days), dtype=bool)
+    mask = days.dayofweek < 5
+    for month, day in HOLIDAYS.get(calendar, []):
+        mask &= ~((days.month == month) & (days.day == day))
+    return np.asarray(mask)
+
+
+def factor_returns(days: pd.DatetimeIndex, seed=42) -> np.ndarray:
+    """Rendements journaliers des facteurs communs (jours calendaires x facteurs)."""
+    rng = np.random.default_rng([seed, 10**9])
+    return rng.standard_normal((len(days), len(FACTORS))) * FACTOR_VOL
+
+
+def _garch_returns(z, var0):
+    """
+    Innovations idiosyncratiques GARCH(1,1), vectorisées sur les tickers
+    (boucle sur le temps seulement). z : (T, n) normales, var0 : (n,) variance
+    de long terme.
+    """
+    omega = var0 * (1 - GARCH_ALPHA - GARCH_BETA)
+    out = np.empty_like(z)
+    var = var0.copy()
+    prev = np.zeros_like(var0)
+    for t in range(z.shape[0]):
+        var = omega + GARCH_ALPHA * prev ** 2 + GARCH_BETA * var
+        prev = np.sqrt(var) * z[t]
+        out[t] = prev
+    return out
+
+
+def _bridge(log_open, log_close, sigma, steps, rng):
+    """
+    Ponts browniens (un par ligne) de log_open à log_close en `steps` pas.
+    Renvoie un tableau (n, steps + 1).
+    """
+    n = len(log_open)
+    w = np.zeros((n, steps + 1))
+    w[:, 1:] = np.cumsum(rng.standard_normal((n, steps)) * (sigma[:, None] / np.sqrt(steps)), axis=1)
+    frac = np.linspace(0.0, 1.0, steps + 1)
+    bridge = w - frac * w[:, -1:]
+    return log_open[:, None] + frac * (log_close - log_open)[:, None] + bridge
+
+
+def _simulate_chunk(universe, days, factors, seed, offset):
+    """Log-prix de clôture (jours calendaires x tickers) d'un paquet, plus les rendements."""
+    n, T = len(universe), len(days)
+    betas = np.stack(universe["betas"].to_numpy())
+    vol_d = universe["vol"].to_numpy() / np.sqrt(365)
+    sys_var = (betas ** 2 * FACTOR_VOL ** 2).sum(axis=1)
+    idio_var = np.maximum(vol_d ** 2 - sys_var, (0.3 * vol_d) ** 2)
+
+    z = np.empty((T, n))
+    jumps = np.zeros((T, n))
+    for k in range(n):
+        rng = _ticker_rng(seed, offset + k, STREAM_RETURNS)
+        z[:, k] = rng.standard_normal(T)
+        lam = ASSET_CLASSES[universe["asset_class"].iat[k]]["jumps"] / 365
+        hits = rng.random(T) < lam
+        jumps[hits, k] = rng.normal(-0.01, 3 * vol_d[k], hits.sum())
+
+    mu_d = universe["mu"].to_numpy() / 365
+    # Somme explicite plutôt qu'un produit matriciel : résultat identique au bit
+    # près quelle que soit la taille du paquet
+    systematic = (factors[:, None, :] * betas[None, :, :]).sum(axis=2)
+    log_ret = (mu_d - 0.5 * vol_d ** 2) + systematic + _garch_returns(z, idio_var) + jumps
+    log_close = np.log(universe["price0"].to_numpy()) + np.cumsum(log_ret, axis=0)
+    return log_close, log_ret, vol_d
+
+
+def generate_daily_bars(n_tickers, start="2005-01-01", end="2024-12-31", seed=42, chunk_size=CHUNK_SIZE):
+    """
+    Génère les barres journalières OHLCV par paquets de `chunk_size` tickers.
+    Itérateur de (univers du paquet, {symbole: DataFrame}) ; chaque actif
+    n'a que les séances de son calendrier (les mouvements du week-end d'une
+    action sont reportés sur le lundi).
+    """
+    days = pd.date_range(start, end, freq="D")
+    factors = factor_returns(days, seed)
+    universe = make_universe(n_tickers, seed)
+
+    for offset in range(0, n_tickers, chunk_size):
+        chunk = universe.iloc[offset:offset + chunk_size].reset_index(drop=True)
+        log_close, log_ret, vol_d = _simulate_chunk(chunk, days, factors, seed, offset)
+        bars = {}
+        for k, row in chunk.iterrows():
+            rng = _ticker_rng(seed, offset + k, STREAM_DAILY)
+            mask = trading_days(row["asset_class"], days)
+            close = log_close[mask, k]
+            prev = np.concatenate([[np.log(row["price0"])], close[:-1]])
+            # Écart d'ouverture : une part du mouvement depuis la clôture précédente
+            gap = ASSET_CLASSES[row["asset_class"]]["gap"]
+            log_open = prev + gap * (close - prev) + rng.normal(0, 0.1 * vol_d[k], len(close)) * (gap > 0)
+            path = _bridge(log_open, close, np.full(len(close), vol_d[k]), DAILY_BRIDGE_STEPS, rng)
+
+            abs_ret = np.abs(close - prev)
+            volume = row["volume0"] * np.exp(rng.normal(0, 0.3, len(close))) * (1 + 20 * abs_ret)
+            bars[row["Symbol"]] = pd.DataFrame({
+                "Open": np.exp(log_open),
+                "High": np.exp(path.max(axis=1)),
+                "Low": np.exp(path.min(axis=1)),
+                "Close": np.exp(close),
+                "Volume": np.round(volume),
+            }, index=pd.DatetimeIndex(days[mask], name="Date"))
+        yield chunk, bars
+
+
+def intraday_bars(daily: pd.DataFrame, asset_class, days=30, interval_minutes=60, seed=42, i=0) -> pd.DataFrame:
+    """
+    Barres intraday des `days` dernières séances d'un actif : pont brownien
+    entre l'ouverture et la clôture de chaque séance (index avec fuseau de la
+    place de cotation). High / Low restent dans la fourchette du jour.
+    """
+    spec = ASSET_CLASSES[asset_class]
+    sessions = daily.tail(days)
+    if sessions.empty:
+        return pd.DataFrame(columns=daily.columns)
+    rng = _ticker_rng(seed, i, STREAM_INTRADAY)
+
+    open_time, n_hours = spec["session"]
+    n_bars = int(n_hours * 60 // interval_minutes)
+    steps = n_bars * INTRADAY_SUBSTEPS
+    log_open = np.log(sessions["Open"].to_numpy())
+    log_close = np.log(sessions["Close"].to_numpy())
+    sigma = np.log(sessions["High"].to_numpy() / sessions["Low"].to_numpy()) / 2
+    path = _bridge(log_open, log_close, sigma, steps, rng)
+
+    # (séances, barres, sous-pas + 1) : chaque barre reprend la fin de la précédente
+    idx = np.arange(n_bars)[:, None] * INTRADAY_SUBSTEPS + np.arange(INTRADAY_SUBSTEPS + 1)
+    seg = np.exp(path[:, idx])
+    o, c = seg[..., 0], seg[..., -1]
+    h = np.minimum(seg.max(axis=2), sessions["High"].to_numpy()[:, None])
+    l = np.maximum(seg.min(axis=2), sessions["Low"].to_numpy()[:, None])
+    h, l = np.maximum(h, np.maximum(o, c)), np.minimum(l, np.minimum(o, c))
+
+    # Volume du jour réparti en U (plus actif à l'ouverture et à la clôture)
+    u = np.linspace(-1, 1, n_bars) ** 2 + 0.5
+    vol = sessions["Volume"].to_numpy()[:, None] * (u / u.sum())
+
+    start = (sessions.index.normalize() + pd.Timedelta(open_time + ":00")).tz_localize(spec["tz"])
+    start = start.tz_convert("UTC").tz_localize(None).to_numpy()
+    stamps = (start[:, None] + np.arange(n_bars) * np.timedelta64(interval_minutes, "m")).ravel()
+    index = pd.DatetimeIndex(stamps).tz_localize("UTC").tz_convert(spec["tz"])
+    return pd.DataFrame({
+        "Open": o.ravel(), "High": h.ravel(), "Low": l.ravel(), "Close": c.ravel(),
+        "Volume": np.round(vol.ravel()),
+    }, index=index.rename("Date"))
+
+
+def write_replay_dataset(root, n_tickers, start="2005-01-01", end="2024-12-31", seed=42,
+                         intraday_days=30, chunk_size=CHUNK_SIZE, report_tickers=0):
+    """
+    Écrit un jeu de données rejouable (barres '1d' et '60m') dans `root`, paquet
+    par paquet. Si `report_tickers` > 0, les rapports HOURLY / DAILY des
+    premiers tickers sont aussi insérés dans market_reports.
+    Renvoie l'univers généré (DataFrame Symbol / asset_class...).
+    """
+    from data.mock_generator import build_mock_reports
+    from data.database import log_market_reports
+
+    universes = []
+    done = 0
+    t0 = time.perf_counter()
+    for chunk, bars in generate_daily_bars(n_tickers, start, end, seed, chunk_size):
+        reports = []
+        for k, row in chunk.iterrows():
+            sym = row["Symbol"]
+            write_replay_bars(root, sym, bars[sym], "1d")
+            if intraday_days:
+                i = done + k
+                intra = intraday_bars(bars[sym], row["asset_class"], intraday_days, seed=seed, i=i)
+                write_replay_bars(root, sym, intra, "60m")
+                if i < report_tickers:
+                    reports.append(build_mock_reports(sym, intra))
+        if reports:
+            log_market_reports(pd.concat(reports, ignore_index=True).to_dict("records"))
+        universes.append(chunk)
+        done += len(chunk)
+        print(f"{done}/{n_tickers} tickers written ({time.perf_counter() - t0:.1f}s)")
+
+    universe = pd.concat(universes, ignore_index=True)
+    universe[["Symbol", "asset_class"]].to_csv(f"{root}/universe.csv", index=False)
+    return universe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic offline market dataset.")
+    parser.add_argument("--out", default="replay_data")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--start", default="2005-01-01")
+    parser.add_argument("--end", default="2024-12-31")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--intraday-days", type=int, default=30)
+    parser.add_argument("--reports", type=int, default=0, help="Insert reports for the first N tickers")
+    args = parser.parse_args()
+    write_replay_dataset(args.out, args.tickers, args.start, args.end, args.seed,
+                         args.intraday_days, report_tickers=args.reports)
+    print(f"Use it with MARKET_DATA_PROVIDER=replay MARKET_DATA_REPLAY_DIR={args.out}")
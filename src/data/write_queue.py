@@ -0,0 +1,106 @@
+"""
+File d'écritures en arrière-plan pour les actions de l'interface.
+
+Publier un portefeuille, supprimer un post ou modifier le bandeau ne doit
+pas bloquer le rendu Streamlit quand la base est occupée (job horaire,
+rollup...). Les pages déposent l'écriture dans une file ; un thread unique
+par processus les exécute dans l'ordre d'arrivée.
+
+Cohérence "read-your-writes" : chaque écriture est rattachée à la session
+qui l'a soumise, et `sync(session)` attend seulement les écritures en
+attente de cette session avant qu'elle relise la base. Les autres sessions
+ne sont jamais bloquées par ces écritures.
+"""
+
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+from concurrent.futures import Future, wait
+
+
+class WriteQueue:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}   # session -> set(Future) pas encore exécutés
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, fn, *args, session=None, **kwargs) -> Future:
+        """
+        Dépose `fn(*args, **kwargs)` dans la file et rend la main tout de suite.
+        Le Future donne le résultat (ou l'exception) une fois l'écriture faite.
+        """
+        future = Future()
+        with self._lock:
+            self._pending.setdefault(session, set()).add(future)
+        self._queue.put((future, session, fn, args, kwargs))
+        return future
+
+    def pending(self, session=None) -> int:
+        with self._lock:
+            return len(self._pending.get(session, ()))
+
+    def sync(self, session=None, timeout=5.0) -> bool:
+        """
+        Attend les écritures en attente de `session` (read-your-writes).
+        Renvoie False si elles ne sont pas toutes terminées après `timeout`.
+        """
+        with self._lock:
+            futures = list(self._pending.get(session, ()))
+        if not futures:
+            return True
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+    def flush(self, timeout=None):
+        """Attend que toute la file soit écrite (tests, arrêt du processus)."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        done = threading.Event()
+        threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True).start()
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            future, session, fn, args, kwargs = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except Exception as e:
+                        print(f"Background write {getattr(fn, '__name__', fn)} failed: {e}")
+                        future.set_exception(e)
+            finally:
+                with self._lock:
+                    futures = self._pending.get(session)
+                    if futures is not None:
+                        futures.discard(future)
+                        if not futures:
+                            del self._pending[session]
+                self._queue.task_done()
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteQueue:
+    """File partagée du processus, démarrée au premier appel."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue()
+            _write_queue.start()
+            # Ne pas perdre les écritures en attente à l'arrêt du serveur
+            atexit.register(_write_queue.flush, 10.0)
+        return _write_queue
@@ -1,57 +1,49 @@
-import yfinance as yf
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from data.database import log_market_report, get_active_tickers_db
+from data.database import log_market_reports, get_active_tickers_db
+from data.market_data import get_provider
+from jobs.telemetry import track_job_run
 
 def generate_daily_report():
     """
     Fetches the latest daily session for all active tickers.
-    Extracts Open, High, Low, Close directly from Yahoo Finance.
+    Extracts Open, High, Low, Close from the market data provider (Yahoo Finance by default).
     Calculates intraday volatility and drawdown based on the daily range.
+    The run is recorded in the job telemetry tables (job 'DAILY').
     """
+    with track_job_run("DAILY") as run:
+        return _generate_daily_report(run)
+
+def _generate_daily_report(run):
     tickers = get_active_tickers_db()
     if not tickers:
         print("No active tickers found for report.")
-        return
+        return 0
 
+    reports = []
+    t_start = time.perf_counter()
     for t in tickers:
+        t0 = time.perf_counter()
         try:
             # Fetch only the last trading day
-            df = yf.download(t, period="1d", progress=False)
+            df = get_provider().get_bars(t, period="1d")
             
             if df.empty:
                 print(f"No data found for {t}")
+                run.add_ticker(t, download_seconds=time.perf_counter() - t0, status="failed", error="no data")
                 continue
+            run.add_ticker(t, download_seconds=time.perf_counter() - t0, rows=len(df),
+                           nbytes=int(df.memory_usage(deep=True).sum()))
 
-            # Handle MultiIndex columns if present (common in new yfinance versions)
-            # We want to access the scalar values of the first (and only) row
-            if isinstance(df.columns, pd.MultiIndex):
-                # Flatten or access directly
-                row = df.iloc[-1]
-                # Assuming level 0 is Price Type, level 1 is Ticker
-                # We try to extract values regardless of structure
-                try:
-                    open_p = float(row['Open'].iloc[0]) if isinstance(row['Open'], pd.Series) else float(row['Open'])
-                    high_p = float(row['High'].iloc[0]) if isinstance(row['High'], pd.Series) else float(row['High'])
-                    low_p = float(row['Low'].iloc[0]) if isinstance(row['Low'], pd.Series) else float(row['Low'])
-                    close_p = float(row['Close'].iloc[0]) if isinstance(row['Close'], pd.Series) else float(row['Close'])
-                    volume = float(row['Volume'].iloc[0]) if isinstance(row['Volume'], pd.Series) else float(row['Volume'])
-                except:
-                    # Fallback for simple index
-                    open_p = float(row['Open'])
-                    high_p = float(row['High'])
-                    low_p = float(row['Low'])
-                    close_p = float(row['Close'])
-                    volume = float(row['Volume'])
-            else:
-                # Standard DataFrame
-                row = df.iloc[-1]
-                open_p = float(row['Open'])
-                high_p = float(row['High'])
-                low_p = float(row['Low'])
-                close_p = float(row['Close'])
-                volume = float(row['Volume'])
+            # The provider always returns flat OHLCV columns
+            row = df.iloc[-1]
+            open_p = float(row['Open'])
+            high_p = float(row['High'])
+            low_p = float(row['Low'])
+            close_p = float(row['Close'])
+            volume = float(row['Volume'])
 
             # Simple Intraday Metrics
             # Volatility: (High - Low) / Open (Daily Range %)
@@ -63,7 +55,7 @@ def generate_daily_report():
             # Prepare data dict
             report_data = {
                 'symbol': t,
-                'period': 'Daily (1d)',
+                'period': 'DAILY',
                 'open': open_p,
                 'close': close_p,
                 'high': high_p,
@@ -73,12 +65,18 @@ def generate_daily_report():
                 'volume': volume
             }
 
-            # Save to DB
-            log_market_report(report_data)
+            reports.append(report_data)
             print(f"Report generated for {t}: Open={open_p}, Close={close_p}")
 
         except Exception as e:
             print(f"Error generating report for {t}: {e}")
+            run.add_ticker(t, download_seconds=time.perf_counter() - t0, status="failed", error=str(e))
+
+    t_write = time.perf_counter()
+    # Save to DB (one transaction for all tickers)
+    count = log_market_reports(reports)
+    run.update(reports=count, fetch_seconds=t_write - t_start, write_seconds=time.perf_counter() - t_write)
+    return count
 
 if __name__ == "__main__":
     generate_daily_report()
\ No newline at end of file
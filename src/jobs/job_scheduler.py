@@ -1,8 +1,68 @@
 import time
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-from data.database import get_active_tickers_db, log_market_report
+from data.market_data import get_provider
+from data.database import get_active_tickers_db, log_market_reports
+from data.intraday_store import append_bars, last_timestamp, read_bars, store_root
+from jobs.rollup import run_rollup
+from jobs.telemetry import track_job_run
+
+# Tickers par appel groupé au provider, et appels groupés simultanés au maximum
+CHUNK_SIZE = 20
+MAX_WORKERS = 4
+
+# Nouvelles tentatives d'un appel groupé qui a levé une exception (attente croissante)
+MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 2.0
+
+# Barres relues depuis le stockage intraday (5 séances, week-end compris)
+STORE_LOOKBACK = pd.Timedelta(days=7)
+
+# Fenêtre des métriques : les 24 dernières barres horaires
+WINDOW_BARS = 24
+
+def compute_metrics_frame(bars_by_ticker, window=WINDOW_BARS):
+    """
+    Métriques de tous les tickers en une passe vectorisée (groupby sur un
+    seul DataFrame long) au lieu d'une boucle par ticker.
+    Renvoie un DataFrame indexé par ticker.
+    """
+    frames = {t: df.tail(window) for t, df in bars_by_ticker.items() if df is not None and not df.empty}
+    if not frames:
+        return pd.DataFrame()
+    long = pd.concat(frames, names=["symbol", "Date"])
+    g = long.groupby(level="symbol", sort=False)
+
+    close = long["Close"]
+    rets = g["Close"].pct_change()
+    roll_max = g["Close"].cummax()
+    dd = (close - roll_max) / roll_max
+
+    out = pd.DataFrame({
+        'open': g["Open"].first(),
+        'close': g["Close"].last(),
+        'high': g["High"].max(),
+        'low': g["Low"].min(),
+        'volume': g["Volume"].sum(),
+        'volatility': rets.groupby(level="symbol", sort=False).std() * np.sqrt(24),
+        'max_drawdown': dd.groupby(level="symbol", sort=False).min(),
+    })
+    out['volatility'] = out['volatility'].fillna(0.0)
+    return out
+
+def _metrics_to_report(ticker, row, period_label):
+    return {
+        'symbol': ticker,
+        'period': period_label, # <--- Utilisation du paramètre dynamique
+        'open': float(row['open']),
+        'close': float(row['close']),
+        'high': float(row['high']),
+        'low': float(row['low']),
+        'volatility': float(row['volatility']),
+        'max_drawdown': float(row['max_drawdown']),
+        'volume': int(row['volume'])
+    }
 
 def calculate_metrics(ticker, period_label='HOURLY'):
     """
@@ -10,48 +70,94 @@ def calculate_metrics(ticker, period_label='HOURLY'):
     period_label: 'HOURLY', 'DAILY', ou 'INSTANT'
     """
     try:
-        # Téléchargement standard (Derniers 5 jours)
-        df = yf.download(ticker, period="5d", interval="60m", progress=False)
-        
-        if df.empty: return None
-        
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-
-        # On prend la dernière ligne disponible
-        last_slice = df.tail(24) 
-        
-        if last_slice.empty: return None
-
-        # Valeurs actuelles
-        price_open = float(last_slice['Open'].iloc[0])
-        price_close = float(last_slice['Close'].iloc[-1])
-        price_high = float(last_slice['High'].max())
-        price_low = float(last_slice['Low'].min())
-        volume = int(last_slice['Volume'].sum())
-        
-        rets = last_slice['Close'].pct_change().dropna()
-        vol = float(rets.std() * np.sqrt(24)) if not rets.empty else 0.0
-        
-        roll_max = last_slice['Close'].cummax()
-        daily_dd = (last_slice['Close'] - roll_max) / roll_max
-        max_dd = float(daily_dd.min())
-        
-        return {
-            'symbol': ticker,
-            'period': period_label, # <--- Utilisation du paramètre dynamique
-            'open': price_open,
-            'close': price_close,
-            'high': price_high,
-            'low': price_low,
-            'volatility': vol,
-            'max_drawdown': max_dd,
-            'volume': volume
-        }
+        # Barres horaires des derniers jours (stockage local complété si besoin)
+        bars, _ = fetch_bars_parallel([ticker])
+        df = bars.get(ticker)
+        if df is None or df.empty: return None
+
+        metrics = compute_metrics_frame({ticker: df})
+        if metrics.empty: return None
+        return _metrics_to_report(ticker, metrics.iloc[0], period_label)
     except Exception as e:
         print(f"Error {ticker}: {e}")
         return None
 
+def _fetch_windows(tickers, period, root, now, chunk_size):
+    """
+    Découpe les tickers en appels groupés, chacun avec sa fenêtre :
+    - historique récent déjà stocké -> depuis le jour UTC de la dernière barre
+      (la barre encore en formation est rafraîchie, le reste vient du disque) ;
+    - rien de récent en stock -> la fenêtre complète `period`.
+    Renvoie [(tickers, {'start': ...} ou {'period': ...})].
+    """
+    full, recent = [], []
+    for t in tickers:
+        last = last_timestamp(t, root)
+        if last is None or last < now - STORE_LOOKBACK:
+            full.append(t)
+        else:
+            recent.append((last, t))
+    # Tickers triés par dernière barre : chaque paquet reste sur une fenêtre étroite
+    recent.sort()
+
+    windows = [(full[i:i + chunk_size], {'period': period}) for i in range(0, len(full), chunk_size)]
+    for i in range(0, len(recent), chunk_size):
+        chunk = recent[i:i + chunk_size]
+        windows.append(([t for _, t in chunk], {'start': chunk[0][0].date()}))
+    return windows
+
+def fetch_bars_parallel(tickers, period="5d", interval="60m", chunk_size=CHUNK_SIZE,
+                        max_workers=MAX_WORKERS, max_retries=MAX_RETRIES, root=None):
+    """
+    Complète le stockage intraday (data.intraday_store) puis y relit les
+    barres des STORE_LOOKBACK derniers jours. Seule la partie manquante est
+    téléchargée (voir `_fetch_windows`), par paquets de `chunk_size` tickers
+    (un appel groupé par paquet), au plus `max_workers` paquets en parallèle.
+    Un paquet dont l'appel lève une exception est retenté jusqu'à
+    `max_retries` fois ; une réponse sans données n'est pas retentée.
+    Renvoie ({ticker: DataFrame}, {ticker: {'seconds', 'attempts', 'error'}}) ;
+    la durée d'un ticker est celle de l'appel groupé qui l'a téléchargé.
+    """
+    root = store_root(interval, root)
+    now = pd.Timestamp.now(tz="UTC")
+    windows = _fetch_windows(list(tickers), period, root, now, chunk_size)
+    provider = get_provider()
+
+    def fetch_chunk(job):
+        chunk, window = job
+        bars, stats = {}, {}
+        for attempt in range(1, max_retries + 2):
+            if attempt > 1:
+                time.sleep(RETRY_BACKOFF_SECONDS * (attempt - 1))
+            t0 = time.perf_counter()
+            try:
+                got, error = provider.get_bars_batch(chunk, interval=interval, **window), None
+            except Exception as e:
+                print(f"Error fetching {chunk}: {e}")
+                got, error = {}, f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - t0
+            if error is None:
+                break
+
+        for t in chunk:
+            if error is None:
+                append_bars(t, got.get(t), root)
+                df = read_bars(t, start=now - STORE_LOOKBACK, root=root)
+                if not df.empty:
+                    bars[t] = df
+            stats[t] = {'seconds': elapsed, 'attempts': attempt,
+                        'error': error or (None if t in bars else "no data")}
+        return bars, stats
+
+    bars_by_ticker, fetch_stats = {}, {}
+    if not windows:
+        return bars_by_ticker, fetch_stats
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(windows)), thread_name_prefix="job-fetch") as pool:
+        for bars, stats in pool.map(fetch_chunk, windows):
+            bars_by_ticker.update(bars)
+            fetch_stats.update(stats)
+    return bars_by_ticker, fetch_stats
+
 def run_job(period_label='HOURLY'):
     """
     Lance le job. 
@@ -59,13 +165,45 @@ def run_job(period_label='HOURLY'):
     Peut être appelé avec 'INSTANT' pour le bouton manuel.
     """
     print(f"--- Starting Job ({period_label}) ---")
-    tickers = get_active_tickers_db()
-    count = 0
-    for t in tickers:
-        data = calculate_metrics(t, period_label=period_label)
-        if data:
-            log_market_report(data)
-            count += 1
+    with track_job_run(period_label) as run:
+        tickers = get_active_tickers_db()
+        t0 = time.perf_counter()
+        bars_by_ticker, fetch_stats = fetch_bars_parallel(tickers)
+        t_fetch = time.perf_counter() - t0
+
+        for t in tickers:
+            st = fetch_stats.get(t, {'seconds': 0.0, 'attempts': 0, 'error': "not fetched"})
+            df = bars_by_ticker.get(t)
+            run.add_ticker(
+                t, download_seconds=st['seconds'],
+                rows=0 if df is None else len(df),
+                nbytes=0 if df is None else int(df.memory_usage(deep=True).sum()),
+                attempts=st['attempts'],
+                status="ok" if st['error'] is None else "failed", error=st['error'],
+            )
+            print(f"  {t}: download {st['seconds']:.2f}s ({st['attempts']} attempt(s))")
+
+        t1 = time.perf_counter()
+        metrics = compute_metrics_frame(bars_by_ticker)
+        reports = [_metrics_to_report(t, row, period_label) for t, row in metrics.iterrows()]
+        t_compute = time.perf_counter() - t1
+
+        missing = [t for t in tickers if t not in metrics.index]
+        if missing:
+            print(f"No data for: {', '.join(missing)}")
+        print(f"  fetch {t_fetch:.2f}s | compute {t_compute:.3f}s")
+
+        # Une seule transaction pour tout le job
+        t2 = time.perf_counter()
+        count = log_market_reports(reports)
+
+        # Compactage incrémental des anciens rapports (ne doit pas faire échouer le job)
+        try:
+            run_rollup()
+        except Exception as e:
+            print(f"Rollup failed: {e}")
+        run.update(reports=count, fetch_seconds=t_fetch, compute_seconds=t_compute,
+                   write_seconds=time.perf_counter() - t2)
     print(f"--- Job Finished. {count} reports. ---")
     return count
 
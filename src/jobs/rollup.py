@@ -0,0 +1,155 @@
+"""
+Agrégation et rétention des rapports de marché.
+
+Les rapports HOURLY / INSTANT s'accumulent à chaque exécution du job. Ce
+module les compacte en agrégats journaliers (DAILY_ROLLUP) puis
+hebdomadaires (WEEKLY_ROLLUP) : OHLCV, volatilité réalisée et drawdown du
+bucket. Chaque niveau garde un "watermark" (fin du dernier bucket agrégé,
+table rollup_state) : une exécution n'agrège que les buckets clos depuis la
+précédente. La politique de rétention supprime ensuite les lignes trop
+anciennes, mais jamais une ligne qui n'a pas encore été agrégée.
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.database import get_connection, transaction, log_market_reports, bucket_start, to_epoch
+
+# Niveaux d'agrégation, dans l'ordre : (type produit, types sources)
+ROLLUP_TIERS = [
+    ("DAILY_ROLLUP", ("HOURLY", "INSTANT")),
+    ("WEEKLY_ROLLUP", ("DAILY_ROLLUP",)),
+]
+
+# Durée de conservation (jours) par type de rapport ; None = pour toujours
+RETENTION_DAYS = {
+    "INSTANT": 7,
+    "HOURLY": 30,
+    "DAILY": None,
+    "DAILY_ROLLUP": 2 * 365,
+    "WEEKLY_ROLLUP": None,
+}
+
+SOURCE_COLUMNS = ["symbol", "bucket", "price_open", "price_close", "price_high",
+                  "price_low", "max_drawdown", "volume"]
+
+
+def _now_epoch(now=None):
+    return int(time.time()) if now is None else to_epoch(now)
+
+
+def get_watermark(conn, tier):
+    row = conn.execute("SELECT watermark FROM rollup_state WHERE tier = ?", (tier,)).fetchone()
+    return row[0] if row else None
+
+
+def aggregate_reports(rows: pd.DataFrame, tier: str) -> list:
+    """
+    Agrège des rapports sources (colonnes SOURCE_COLUMNS) en un rapport par
+    (symbole, bucket du niveau `tier`). Calcul vectorisé sur tous les symboles.
+    """
+    if rows.empty:
+        return []
+    rows = rows.sort_values(["symbol", "bucket"]).reset_index(drop=True)
+    rows["target"] = bucket_start(rows["bucket"].to_numpy(dtype="int64"), tier)
+    keys = [rows["symbol"], rows["target"]]
+
+    # Volatilité réalisée du bucket : racine de la somme des carrés des log-rendements
+    prev_close = rows.groupby(keys)["price_close"].shift()
+    log_ret = np.log(rows["price_close"] / prev_close)
+    rows["sq_ret"] = log_ret.pow(2)
+    # Drawdown le long des clôtures du bucket
+    peak = rows.groupby(keys)["price_close"].cummax()
+    rows["path_dd"] = (rows["price_close"] - peak) / peak
+
+    agg = rows.groupby(["symbol", "target"], sort=True).agg(
+        open=("price_open", "first"),
+        close=("price_close", "last"),
+        high=("price_high", "max"),
+        low=("price_low", "min"),
+        volume=("volume", "sum"),
+        sq_ret=("sq_ret", "sum"),
+        path_dd=("path_dd", "min"),
+        src_dd=("max_drawdown", "min"),
+    ).reset_index()
+    agg["volatility"] = np.sqrt(agg["sq_ret"])
+    agg["max_drawdown"] = agg[["path_dd", "src_dd"]].min(axis=1).fillna(0.0)
+    agg["timestamp"] = agg["target"].astype("int64")
+    agg["period"] = tier
+
+    cols = ["timestamp", "symbol", "period", "open", "close", "high", "low", "volatility", "max_drawdown", "volume"]
+    return agg[cols].to_dict("records")
+
+
+def rollup_tier(tier, sources, now=None) -> int:
+    """
+    Agrège les buckets clos de `tier` depuis le dernier watermark.
+    Renvoie le nombre de rapports agrégés écrits.
+    """
+    cutoff = bucket_start(_now_epoch(now), tier)  # début du bucket en cours (pas encore clos)
+    with transaction() as conn:
+        watermark = get_watermark(conn, tier) or 0
+        if watermark >= cutoff:
+            return 0
+        placeholders = ", ".join("?" * len(sources))
+        rows = pd.read_sql_query(
+            f"SELECT {', '.join(SOURCE_COLUMNS)} FROM market_reports "
+            f"WHERE period IN ({placeholders}) AND bucket >= ? AND bucket < ?",
+            conn, params=[*sources, watermark, cutoff],
+        )
+        written = log_market_reports(aggregate_reports(rows, tier))
+        conn.execute(
+            "INSERT INTO rollup_state (tier, watermark) VALUES (?, ?) "
+            "ON CONFLICT (tier) DO UPDATE SET watermark = excluded.watermark",
+            (tier, cutoff),
+        )
+    return written
+
+
+def apply_retention(retention=None, now=None) -> int:
+    """
+    Supprime les rapports plus anciens que leur durée de conservation.
+    Une ligne source n'est supprimée qu'une fois agrégée (bucket < watermark).
+    Renvoie le nombre de lignes supprimées.
+    """
+    retention = RETENTION_DAYS if retention is None else retention
+    now_epoch = _now_epoch(now)
+    deleted = 0
+    with transaction() as conn:
+        for period, days in retention.items():
+            if days is None:
+                continue
+            limit = now_epoch - int(days * 86400)
+            for tier, sources in ROLLUP_TIERS:
+                if period in sources:
+                    limit = min(limit, get_watermark(conn, tier) or 0)
+            cur = conn.execute("DELETE FROM market_reports WHERE period = ? AND bucket < ?", (period, limit))
+            deleted += cur.rowcount
+    return deleted
+
+
+def run_rollup(now=None, retention=None):
+    """Agrège tous les niveaux (dans l'ordre) puis applique la rétention."""
+    summary = {}
+    for tier, sources in ROLLUP_TIERS:
+        summary[tier] = rollup_tier(tier, sources, now=now)
+    summary["deleted"] = apply_retention(retention, now=now)
+    print(f"--- Rollup: {summary} ---")
+    return summary
+
+
+def get_table_stats():
+    """Nombre de lignes par type de rapport (pour vérifier que la table reste bornée)."""
+    try:
+        with get_connection() as conn:
+            return dict(conn.execute("SELECT period, COUNT(*) FROM market_reports GROUP BY period").fetchall())
+    except: return {}
+
+
+if __name__ == "__main__":
+    run_rollup()
+    print(get_table_stats())
@@ -0,0 +1,197 @@
+"""
+Planificateur résident des jobs de rapports (remplace le crontab).
+
+Lancement (depuis la racine du dépôt, comme Streamlit : chemins relatifs de la
+base et du cache identiques) : `PYTHONPATH=src python -m jobs.scheduler_daemon`
+
+Un seul processus long : pandas / yfinance ne sont importés qu'une fois, la
+connexion SQLite du pool et le cache de prix restent chauds d'un run à
+l'autre. Chaque job a un créneau régulier (HOURLY toutes les heures, DAILY
+une fois par jour) décalé d'un petit délai aléatoire (jitter) pour ne pas
+frapper Yahoo pile à l'heure. Si le processus était arrêté pendant un ou
+plusieurs créneaux, le job est rattrapé une seule fois au redémarrage ; au
+tout premier démarrage (aucun créneau enregistré), rien n'est rattrapé. Le
+dernier créneau exécuté et l'état du dernier run sont dans la table
+scheduler_status.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import signal
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+
+from data.database import init_db, get_connection, transaction
+from jobs.job_scheduler import run_job
+from jobs.daily_report import generate_daily_report
+
+# Délai aléatoire maximal (secondes) après le début d'un créneau
+JITTER_SECONDS = 120
+
+# Attente maximale entre deux vérifications (pour rester réactif à l'arrêt)
+MAX_SLEEP_SECONDS = 60
+
+
+@dataclass
+class Schedule:
+    name: str
+    every: int                 # période (secondes)
+    offset: int                # décalage du créneau dans la période (secondes, UTC)
+    run: Callable[[], object]
+
+    def slot(self, now):
+        """Début (epoch) du dernier créneau commencé à `now`."""
+        return int((now - self.offset) // self.every * self.every + self.offset)
+
+
+SCHEDULES = [
+    Schedule("HOURLY", every=3600, offset=0, run=lambda: run_job('HOURLY')),
+    # 22:00 UTC : après la clôture de Wall Street
+    Schedule("DAILY", every=86400, offset=22 * 3600, run=generate_daily_report),
+]
+
+
+def get_last_slot(job):
+    with get_connection() as conn:
+        row = conn.execute("SELECT last_slot FROM scheduler_status WHERE job = ?", (job,)).fetchone()
+    return row[0] if row else None
+
+
+def _record_run(job, slot, start, end, status, result=None, error=None):
+    with transaction() as conn:
+        conn.execute('''
+            INSERT INTO scheduler_status (job, last_slot, last_start, last_end, last_status, last_result, last_error)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job) DO UPDATE SET
+                last_slot = excluded.last_slot,
+                last_start = excluded.last_start,
+                last_end = excluded.last_end,
+                last_status = excluded.last_status,
+                last_result = excluded.last_result,
+                last_error = excluded.last_error
+        ''', (job, slot, int(start), int(end), status, None if result is None else str(result), error))
+
+
+def _seed_slot(job, slot):
+    """Marque `slot` comme traité pour un job jamais lancé (sans état de run)."""
+    with transaction() as conn:
+        conn.execute('''
+            INSERT INTO scheduler_status (job, last_slot) VALUES (?, ?)
+            ON CONFLICT (job) DO UPDATE SET last_slot = excluded.last_slot
+            WHERE scheduler_status.last_slot IS NULL
+        ''', (job, int(slot)))
+
+
+def _record_next_run(job, next_run):
+    with transaction() as conn:
+        conn.execute('''
+            INSERT INTO scheduler_status (job, next_run) VALUES (?, ?)
+            ON CONFLICT (job) DO UPDATE SET next_run = excluded.next_run
+        ''', (job, int(next_run)))
+
+
+def get_scheduler_status() -> pd.DataFrame:
+    """État des jobs (dernier run, prochain run prévu), horodatages en datetime64 UTC."""
+    try:
+        with get_connection() as conn:
+            df = pd.read_sql_query("SELECT * FROM scheduler_status ORDER BY job", conn)
+        for col in ("last_slot", "last_start", "last_end", "next_run"):
+            df[col] = pd.to_datetime(df[col], unit="s", utc=True)
+        return df
+    except: return pd.DataFrame()
+
+
+class SchedulerDaemon:
+    def __init__(self, schedules=None, jitter=JITTER_SECONDS):
+        self.schedules = schedules or SCHEDULES
+        self.jitter = jitter
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def _due_at(self, schedule, slot):
+        # Jitter tiré une fois par (job, créneau) : stable d'une vérification à l'autre
+        return slot + random.Random(f"{schedule.name}:{slot}").uniform(0, self.jitter)
+
+    def run_pending(self, now=None):
+        """
+        Exécute les jobs dont le créneau courant n'a pas encore été traité.
+        Plusieurs créneaux manqués (processus arrêté) = un seul rattrapage.
+        Renvoie l'epoch du prochain réveil.
+        """
+        now = time.time() if now is None else now
+        wake = now + MAX_SLEEP_SECONDS
+        for schedule in self.schedules:
+            slot = schedule.slot(now)
+            last = get_last_slot(schedule.name)
+            if last is None:
+                # Premier démarrage : aucun rattrapage, le premier run est le prochain créneau
+                _seed_slot(schedule.name, slot)
+                last = slot
+            pending = last < slot
+            due = self._due_at(schedule, slot if pending else slot + schedule.every)
+            if now >= due:
+                self.run_job(schedule, slot)
+                due = self._due_at(schedule, slot + schedule.every)
+                _record_next_run(schedule.name, due)
+            wake = min(wake, due)
+        return wake
+
+    def run_job(self, schedule, slot):
+        start = time.time()
+        print(f"[scheduler] {schedule.name} slot {pd.Timestamp(slot, unit='s')} started")
+        try:
+            result = schedule.run()
+        except Exception as e:
+            traceback.print_exc()
+            _record_run(schedule.name, slot, start, time.time(), "error", error=str(e))
+        else:
+            _record_run(schedule.name, slot, start, time.time(), "ok", result=result)
+        print(f"[scheduler] {schedule.name} finished in {time.time() - start:.1f}s")
+
+    def run_forever(self):
+        init_db()
+        print(f"[scheduler] started with jobs: {', '.join(s.name for s in self.schedules)}")
+        while not self._stop.is_set():
+            try:
+                wake = self.run_pending()
+            except Exception:
+                traceback.print_exc()
+                wake = time.time() + MAX_SLEEP_SECONDS
+            self._stop.wait(max(1.0, wake - time.time()))
+        print("[scheduler] stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident scheduler for the market report jobs.")
+    parser.add_argument("--once", choices=[s.name for s in SCHEDULES], help="Run one job now and exit")
+    parser.add_argument("--status", action="store_true", help="Print the last run status and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        init_db()
+        print(get_scheduler_status().to_string(index=False))
+        return
+
+    daemon = SchedulerDaemon()
+    if args.once:
+        init_db()
+        schedule = next(s for s in SCHEDULES if s.name == args.once)
+        daemon.run_job(schedule, schedule.slot(time.time()))
+        return
+
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run_forever()
+
+
+if __name__ == "__main__":
+    main()
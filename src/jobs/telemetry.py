@@ -0,0 +1,147 @@
+"""
+Télémétrie des jobs planifiés.
+
+Chaque exécution d'un job est enregistrée dans job_runs (début, fin, durée,
+statut, volumes, temps de téléchargement / calcul / écriture, échecs et
+nouvelles tentatives) et le détail par ticker dans job_run_tickers. Tout est
+écrit en une transaction à la fin du run, pour ne pas ralentir le job.
+Le panneau "Job Telemetry" de l'onglet Reports lit ces tables.
+"""
+
+from __future__ import annotations
+
+import time
+import traceback
+from contextlib import contextmanager
+
+import pandas as pd
+
+from data.database import get_connection, transaction, to_epoch
+
+# Intervalle nominal de chaque job (secondes) : seuil d'alerte du panneau
+JOB_INTERVALS = {"HOURLY": 3600, "DAILY": 86400, "INSTANT": 3600}
+
+RUN_FIELDS = ("tickers", "failures", "retries", "reports", "rows_fetched", "bytes_fetched",
+              "fetch_seconds", "compute_seconds", "write_seconds")
+
+
+class JobRun:
+    """Mesures d'une exécution, remplies par le job puis écrites par `track_job_run`."""
+
+    def __init__(self, job):
+        self.job = job
+        self.started_at = time.time()
+        self.metrics = {f: 0 for f in RUN_FIELDS}
+        self.ticker_stats = {}
+
+    def add_ticker(self, symbol, download_seconds=0.0, rows=0, nbytes=0, attempts=1, status="ok", error=None):
+        self.ticker_stats[symbol] = (float(download_seconds), int(rows), int(nbytes), int(attempts), status, error)
+
+    def update(self, **metrics):
+        unknown = set(metrics) - set(RUN_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job metrics: {sorted(unknown)}")
+        self.metrics.update(metrics)
+
+    def _totals(self):
+        stats = self.ticker_stats.values()
+        if stats:
+            # Valeurs dérivées du détail par ticker, sauf si le job les a données
+            derived = {
+                "tickers": len(self.ticker_stats),
+                "failures": sum(1 for s in stats if s[4] != "ok"),
+                "retries": sum(max(s[3] - 1, 0) for s in stats),
+                "rows_fetched": sum(s[1] for s in stats),
+                "bytes_fetched": sum(s[2] for s in stats),
+            }
+            for k, v in derived.items():
+                if not self.metrics.get(k):
+                    self.metrics[k] = v
+        return self.metrics
+
+
+def _save_run(run, status, error, ended_at):
+    m = run._totals()
+    with transaction() as conn:
+        cur = conn.execute(f'''
+            INSERT INTO job_runs (job, started_at, ended_at, duration, status, error, {", ".join(RUN_FIELDS)})
+            VALUES (?, ?, ?, ?, ?, ?, {", ".join("?" * len(RUN_FIELDS))})
+        ''', (run.job, run.started_at, ended_at, ended_at - run.started_at, status, error,
+              *[m[f] for f in RUN_FIELDS]))
+        run_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO job_run_tickers (run_id, symbol, download_seconds, rows, bytes, attempts, status, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, sym, *stats) for sym, stats in run.ticker_stats.items()],
+        )
+    return run_id
+
+
+@contextmanager
+def track_job_run(job):
+    """
+    Enregistre l'exécution du bloc comme un run de `job` :
+
+        with track_job_run("HOURLY") as run:
+            run.add_ticker("AAPL", download_seconds=0.4, rows=120)
+            run.update(reports=1)
+
+    Une exception dans le bloc est enregistrée (statut 'error') puis relevée.
+    L'écriture de la télémétrie ne fait jamais échouer le job.
+    """
+    run = JobRun(job)
+    status, error = "ok", None
+    try:
+        yield run
+    except BaseException as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            _save_run(run, status, error, time.time())
+        except Exception:
+            traceback.print_exc()
+
+
+def get_job_runs(job=None, since=None, limit=500) -> pd.DataFrame:
+    """Derniers runs (plus récent d'abord), horodatages en datetime64 UTC."""
+    clauses, params = [], []
+    if job:
+        clauses.append("job = ?")
+        params.append(job)
+    if since is not None:
+        clauses.append("started_at >= ?")
+        params.append(to_epoch(since))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    try:
+        with get_connection() as conn:
+            df = pd.read_sql_query(f"SELECT * FROM job_runs{where} ORDER BY started_at DESC LIMIT ?",
+                                   conn, params=[*params, int(limit)])
+    except: return pd.DataFrame()
+    for col in ("started_at", "ended_at"):
+        df[col] = pd.to_datetime(df[col], unit="s", utc=True)
+    return df
+
+
+def get_run_tickers(run_id) -> pd.DataFrame:
+    try:
+        with get_connection() as conn:
+            return pd.read_sql_query(
+                "SELECT * FROM job_run_tickers WHERE run_id = ? ORDER BY download_seconds DESC",
+                conn, params=(int(run_id),))
+    except: return pd.DataFrame()
+
+
+def duration_percentiles(job, freq="D", quantiles=(0.5, 0.9, 0.99), since=None) -> pd.DataFrame:
+    """
+    Percentiles de durée des runs de `job` par période `freq` ('D', 'W'...).
+    Colonnes 'p50', 'p90', 'p99', 'max' et 'runs' ; index = début de période.
+    """
+    runs = get_job_runs(job, since=since, limit=100_000)
+    if runs.empty:
+        return pd.DataFrame()
+    g = runs.set_index("started_at")["duration"].resample(freq)
+    out = pd.DataFrame({f"p{int(q * 100)}": g.quantile(q) for q in quantiles})
+    out["max"] = g.max()
+    out["runs"] = g.count()
+    return out[out["runs"] > 0]
@@ -0,0 +1,85 @@
+"""
+Alignement des prix de clôture de plusieurs actifs sur un même axe de dates.
+
+Les actifs n'ont pas le même calendrier (crypto 7j/7, Euronext, NYSE, Forex) :
+un simple `dropna()` jette toutes les dates où un seul marché est fermé, et
+un `ffill().bfill()` recopie des prix futurs dans le passé. Toutes les
+variantes ci-dessous travaillent en une passe vectorisée sur la matrice
+des clôtures (dates x tickers) et ne propagent un prix que vers l'avant.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+
+ALIGN_MODES = ("intersection", "union", "resample")
+
+
+def to_close_matrix(closes) -> pd.DataFrame:
+    """Accepte une matrice déjà jointe ou un dict {ticker: Series} (jointure externe unique)."""
+    if isinstance(closes, pd.DataFrame):
+        return closes.sort_index()
+    if not closes:
+        return pd.DataFrame()
+    return pd.concat(closes, axis=1, join="outer").sort_index()
+
+
+def _fill_forward(matrix: pd.DataFrame, max_gap=None) -> pd.DataFrame:
+    """
+    Propage le dernier prix connu (jamais de bfill) puis coupe le début,
+    tant qu'un actif n'a pas encore coté.
+    """
+    filled = matrix.ffill(limit=max_gap)
+    starts = matrix.apply(pd.Series.first_valid_index)
+    if starts.isna().any():
+        # Un actif sans aucune donnée : rien d'alignable
+        return filled.iloc[0:0]
+    filled = filled.loc[starts.max():]
+    # Trous plus longs que max_gap : on écarte la date plutôt que d'inventer un prix
+    return filled.dropna(how="any")
+
+
+def align_prices(closes, how="intersection", freq="B", max_gap=None) -> pd.DataFrame:
+    """
+    Aligne une matrice de clôtures (index Date, une colonne par ticker).
+
+    Parameters
+    ----------
+    how : str
+        - 'intersection' : seulement les dates où tous les actifs cotent ;
+        - 'union'        : toutes les dates, dernier prix connu propagé vers l'avant ;
+        - 'resample'     : ramène chaque actif sur le calendrier `freq` (dernier
+                           prix de chaque période) puis propage vers l'avant.
+    freq : str
+        Calendrier cible pour 'resample' : 'B' (jours ouvrés), 'D' (7j/7),
+        'W-FRI' (hebdomadaire)... Les périodes sont fermées à droite : le prix
+        du dimanche d'une crypto est rattaché au lundi, jamais au vendredi.
+        La dernière période n'est jamais datée après la dernière barre reçue.
+    max_gap : int | None
+        Nombre maximal de périodes consécutives propagées (None = illimité).
+    """
+    if how not in ALIGN_MODES:
+        raise ValueError(f"Unknown alignment mode {how!r} (expected one of {ALIGN_MODES})")
+
+    matrix = to_close_matrix(closes)
+    if matrix.empty:
+        return matrix
+
+    if how == "intersection":
+        return matrix.dropna(how="any")
+
+    last_date = matrix.index.max()
+    if how == "resample":
+        matrix = matrix.resample(freq, closed="right", label="right").last()
+        # Les bins fermés à droite peuvent dépasser la dernière barre réelle :
+        # bins vides après la fin supprimés (pas de jour inventé), période en
+        # cours (ex: semaine non terminée) datée de la dernière barre.
+        beyond = matrix.index > last_date
+        matrix = matrix[~beyond | matrix.notna().any(axis=1)]
+        matrix.index = matrix.index.where(matrix.index <= last_date, last_date)
+
+    aligned = _fill_forward(matrix, max_gap=max_gap)
+    # Garde-fou : jamais de date postérieure aux données d'entrée
+    aligned = aligned.loc[:last_date]
+    aligned.index.name = "Date"
+    return aligned
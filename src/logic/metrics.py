@@ -106,6 +106,56 @@ def summarize_strategy(
     return summary
 
 
+def summarize_equity_matrix(
+    equity,
+    returns,
+    initial_capital: float = 1_000.0,
+    periods_per_year: int = 252,
+    risk_free_rate: float = 0.0,
+    n_obs=None,
+) -> pd.DataFrame:
+    """
+    Version matricielle de `summarize_strategy` : une colonne d'`equity` /
+    `returns` (dates x stratégies) par variante, une ligne de métriques par
+    colonne. Mêmes définitions (NaN des rendements ignorés).
+
+    n_obs : nombre de rendements à compter par colonne quand les lignes hors
+    de la fenêtre de chaque variante sont à zéro (au lieu de NaN).
+    """
+    equity = np.asarray(equity, dtype=float)
+    r = np.asarray(returns, dtype=float)
+    if n_obs is None:
+        valid = ~np.isnan(r)
+        n = valid.sum(axis=0)
+        r = np.where(valid, r, 0.0)
+    else:
+        n = np.asarray(n_obs)
+
+    # Moyenne / écart-type (ddof=1) à partir des sommes : une passe par moment
+    s1 = r.sum(axis=0)
+    s2 = np.einsum("ij,ij->j", r, r)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1 / n
+        var = np.maximum(s2 - n * mean**2, 0.0) / (n - 1)
+        ar = np.where(n > 0, (1.0 + mean) ** periods_per_year - 1.0, np.nan)
+        vol = np.where(n > 1, np.sqrt(var * periods_per_year), np.nan)
+        sr = np.where(vol > 0, (ar - risk_free_rate) / vol, np.nan)
+
+    peak = np.maximum.accumulate(equity, axis=0)
+    np.divide(equity, peak, out=peak)
+    mdd = peak.min(axis=0) - 1.0
+
+    return pd.DataFrame(
+        {
+            "final_equity": equity[-1],
+            "total_return": equity[-1] / initial_capital - 1.0,
+            "annualized_return": ar,
+            "annualized_volatility": vol,
+            "sharpe_ratio": sr,
+            "max_drawdown": mdd,
+        }
+    )
+
 if __name__ == "__main__":
     # Petit test rapide en branchant sur les modules existants
     from data.data_single_asset import get_price_history, DEFAULT_TICKER
@@ -1,20 +1,31 @@
 import pandas as pd
 import numpy as np
-from data.data_single_asset import get_price_history
+from data.data_single_asset import get_close_matrix
+from logic.alignment import align_prices
 from logic.metrics import summarize_strategy
 
-def get_portfolio_data(tickers, years=5):
+# Alignement par défaut : calendrier jours ouvrés. Les mouvements de week-end
+# des cryptos sont rattachés au lundi au lieu de faire disparaître des lignes.
+ALIGN_HOW = "resample"
+ALIGN_FREQ = "B"
+
+def load_portfolio_prices(tickers, years=5, how=ALIGN_HOW, freq=ALIGN_FREQ):
+    """
+    Récupère et aligne les prix en un seul téléchargement groupé.
+    Renvoie (prix alignés, {ticker: erreur}) : un ticker sans données est
+    simplement absent des colonnes au lieu de faire échouer tout le lot ; un
+    ticker dont la mise à jour a échoué garde ses prix en cache (colonne
+    présente) et figure aussi dans les erreurs.
+    `how` / `freq` : voir logic.alignment.align_prices.
+    """
+    if not tickers: return pd.DataFrame(), {}
+    closes, failures = get_close_matrix(tickers, years=years)
+    if closes.empty: return pd.DataFrame(), failures
+    return align_prices(closes, how=how, freq=freq), failures
+
+def get_portfolio_data(tickers, years=5, how=ALIGN_HOW, freq=ALIGN_FREQ):
     """Récupère et aligne les prix."""
-    if not tickers: return pd.DataFrame()
-    df_list = []
-    for t in tickers:
-        df = get_price_history(t, years=years)
-        if not df.empty:
-            df = df[['Close']].rename(columns={'Close': t})
-            df_list.append(df)
-    if not df_list: return pd.DataFrame()
-    # Dropna est crucial pour aligner les dates de départ
-    return pd.concat(df_list, axis=1).dropna()
+    return load_portfolio_prices(tickers, years, how, freq)[0]
 
 def apply_stop_loss(equity_curve, stop_loss_pct):
     """Coupe la position si le drawdown dépasse X%."""
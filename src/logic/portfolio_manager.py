@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
+from data.market_data import get_provider
+from logic.alignment import align_prices
 
 class PortfolioManager:
     def __init__(self, tickers):
@@ -19,38 +20,16 @@ class PortfolioManager:
         if not self.tickers:
             return pd.DataFrame()
 
-        # Download data with group_by='ticker' to handle structure easily
-        # auto_adjust=True ensures we get dividends/splits adjusted prices
-        raw_data = yf.download(
-            self.tickers, 
-            period=period, 
-            group_by='ticker', 
-            auto_adjust=True,
-            progress=False
-        )
+        # One batched request for all tickers (adjusted for dividends/splits)
+        bars = get_provider().get_bars_batch(self.tickers, period=period)
 
         # Process data to keep only Close prices
-        clean_data = pd.DataFrame()
+        # (tickers with no data are simply missing from `bars`)
+        clean_data = pd.DataFrame({t: bars[t]['Close'] for t in self.tickers if t in bars})
 
-        if len(self.tickers) == 1:
-            # Case: Single ticker (yfinance returns a flat DataFrame)
-            ticker = self.tickers[0]
-            if not raw_data.empty:
-                clean_data[ticker] = raw_data['Close']
-        else:
-            # Case: Multiple tickers (yfinance returns MultiIndex columns)
-            for t in self.tickers:
-                try:
-                    # Check if the ticker exists in the downloaded data
-                    # yfinance structure is usually [Ticker] -> [Open, High, Low, Close...]
-                    if t in raw_data.columns:
-                        clean_data[t] = raw_data[t]['Close']
-                except KeyError:
-                    # Handle cases where data might be missing for one asset
-                    continue
-
-        # Fill missing values (forward fill then backward fill) to avoid calculation errors
-        self.data = clean_data.ffill().bfill()
+        # Align calendars by carrying the last known price forward only
+        # (a backward fill would leak future prices into the past)
+        self.data = align_prices(clean_data, how="union")
         
         return self.data
 
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
-from data.data_single_asset import get_price_history 
-from logic.strategies_single import backtest_buy_and_hold, backtest_momentum_sma, backtest_macd
+from data.data_single_asset import get_price_history, get_close_matrix
+from logic.strategies_single import STRATEGIES, run_strategy, grid_backtest_macd, backtest_batch
 from logic.metrics import summarize_strategy
 
 # Palette de couleurs optimisée pour le contraste (Dark & Light mode)
@@ -37,39 +37,60 @@ def compute_analysis_data(ticker, strategy, params, capital, years):
 
     if data.empty: return None, None, None
 
-    res = None
-    strat_short = ""
+    spec = STRATEGIES.get(strategy)
+    if spec is None: return None, None, None
 
     try:
-        if strategy == "Buy & Hold":
-            res = backtest_buy_and_hold(data, initial_capital=capital)
-            strat_short = "B&H"
-        elif strategy == "Momentum SMA":
-            win = params.get('window', 50)
-            res = backtest_momentum_sma(data, window=win, initial_capital=capital)
-            strat_short = f"SMA({win})"
-        elif strategy == "MACD":
-            fast = params.get('fast', 12)
-            slow = params.get('slow', 26)
-            sig = params.get('signal', 9)
-            res = backtest_macd(data, fast=fast, slow=slow, signal=sig, initial_capital=capital)
-            strat_short = f"MACD({fast},{slow},{sig})"
+        res = run_strategy(data, strategy, params, initial_capital=capital)
     except:
         return None, None, None
+    if res.empty: return None, None, None  # historique plus court que la chauffe
 
-    if res is None: return None, None, None
-
+    strat_short = spec.label(params)
     summary = summarize_strategy(res, capital)
     return res, strat_short, summary
 
+def compute_analysis_batch(tickers, strategy, params, capital, years):
+    """
+    Même calcul que `compute_analysis_data` pour plusieurs tickers : un seul
+    chargement des clôtures (dates x tickers) et un seul backtest vectorisé.
+    Renvoie {ticker: (resultat_df, nom_court, résumé)} pour les tickers calculés.
+    """
+    spec = STRATEGIES.get(strategy)
+    if spec is None or not tickers: return {}
+    try:
+        closes, _ = get_close_matrix(tickers, years=years)
+        results, summary = backtest_batch(closes, strategy, params, initial_capital=capital)
+    except:
+        return {}
+    strat_short = spec.label(params)
+    return {t: (res, strat_short, summary.loc[t]) for t, res in results.items()}
+
+def compute_macd_grid(ticker, years, fasts, slows, signals, capital=1000.0, rank_by="sharpe_ratio"):
+    """Grille MACD (fast, slow, signal) sur l'historique du ticker, classée par `rank_by`."""
+    try:
+        data = get_price_history(ticker, years=years)
+        return grid_backtest_macd(data, fasts, slows, signals, initial_capital=capital, rank_by=rank_by)
+    except:
+        return pd.DataFrame()
+
 def update_analyses_duration(new_years):
     if 'analyses' not in st.session_state: return
+    # Un backtest groupé par (stratégie, paramètres, capital)
+    groups = {}
+    for item in st.session_state['analyses']:
+        key = (item['strategy'], tuple(sorted(item['params'].items())), item['capital'])
+        groups.setdefault(key, []).append(item['symbol'])
+    computed = {}
+    for (strategy, params, capital), tickers in groups.items():
+        for t, out in compute_analysis_batch(tickers, strategy, dict(params), capital, new_years).items():
+            computed[(strategy, params, capital, t)] = out
+
     updated_list = []
     for item in st.session_state['analyses']:
-        res, strat_short, summary = compute_analysis_data(
-            item['symbol'], item['strategy'], item['params'], item['capital'], new_years
-        )
-        if res is not None:
+        key = (item['strategy'], tuple(sorted(item['params'].items())), item['capital'], item['symbol'])
+        if key in computed:
+            res, strat_short, summary = computed[key]
             item['data'] = res
             item['summary'] = summary
             item['years'] = new_years
@@ -89,7 +110,7 @@ def get_next_available_color(current_analyses):
     # en prenant une couleur qui dépend de la longueur actuelle
     return COLORS[len(current_analyses) % len(COLORS)]
 
-def add_analysis_to_state(ticker, strategy, params, capital, years, auto=False):
+def add_analysis_to_state(ticker, strategy, params, capital, years, auto=False, computed=None):
     # Initialize list if needed
     if 'analyses' not in st.session_state: st.session_state['analyses'] = []
 
@@ -105,7 +126,8 @@ def add_analysis_to_state(ticker, strategy, params, capital, years, auto=False):
             if not auto: st.toast(f"Graph already exists!", icon="⚠️")
             return
 
-    res, strat_short, summary = compute_analysis_data(ticker, strategy, params, capital, years)
+    # `computed` : résultat déjà calculé en lot (voir sync_tape_to_graphs)
+    res, strat_short, summary = computed or compute_analysis_data(ticker, strategy, params, capital, years)
     
     if res is None:
         if not auto: st.toast(f"Error: No data for {ticker}", icon="❌")
@@ -141,18 +163,18 @@ def sync_tape_to_graphs(current_years):
     tape_tickers = st.session_state.get('tape_tickers', [])
     if 'synced_tickers_snapshot' not in st.session_state: st.session_state['synced_tickers_snapshot'] = []
     
-    current_set = set(tape_tickers)
     snapshot_set = set(st.session_state['synced_tickers_snapshot'])
-    new_tickers = current_set - snapshot_set
+    new_tickers = [t for t in tape_tickers if t not in snapshot_set]
     
-    added = False
-    for t in new_tickers:
-        # L'ajout auto respectera maintenant la limite de 10
-        add_analysis_to_state(t, "Buy & Hold", {}, 1000.0, current_years, auto=True)
-        added = True
+    if new_tickers:
+        # Un seul chargement + backtest pour tous les nouveaux tickers ; la liste
+        # est à jour avant le rendu des graphiques, pas besoin de st.rerun()
+        batch = compute_analysis_batch(new_tickers, "Buy & Hold", {}, 1000.0, current_years)
+        for t in new_tickers:
+            # L'ajout auto respectera maintenant la limite de 10
+            add_analysis_to_state(t, "Buy & Hold", {}, 1000.0, current_years, auto=True, computed=batch.get(t))
     
     st.session_state['synced_tickers_snapshot'] = list(tape_tickers)
-    if added: st.rerun()
 
 def get_rankings(items):
     if not items: return {}
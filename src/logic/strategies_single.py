@@ -1,46 +1,251 @@
-
-
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
 import pandas as pd
+from scipy.signal import lfilter
 
 from data.data_single_asset import get_price_history, DEFAULT_TICKER
 
 
-def _equity_curve_from_returns(
-    returns: pd.Series,
+def _sma_matrix(close: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """
+    SMA de `close` (dates, ou dates x actifs) pour toutes les fenêtres à la
+    fois -> tableau (dates, [actifs,] fenêtres).
+
+    Une seule somme cumulée : SMA_t(w) = (S_t - S_{t-w}) / (N_t - N_{t-w}),
+    N comptant les prix non manquants. Mêmes valeurs que
+    `rolling(window=w, min_periods=1).mean()` (moyenne des premiers prix
+    tant que t < w, NaN ignorés).
+    """
+    x = np.asarray(close, dtype=float).reshape(len(close), -1)
+    valid = ~np.isnan(x)
+    # Prix centrés sur le premier prix de chaque colonne : limite l'erreur
+    # d'arrondi des sommes cumulées
+    ref = np.take_along_axis(x, valid.argmax(axis=0)[None], axis=0)
+    ref = np.where(np.isnan(ref), 0.0, ref)
+    zeros = np.zeros((1, x.shape[1]))
+    sums = np.concatenate((zeros, np.cumsum(np.where(valid, x - ref, 0.0), axis=0)))
+    counts = np.concatenate((zeros, np.cumsum(valid, axis=0)))
+
+    t = np.arange(1, len(x) + 1)
+    lag = np.maximum(t[:, None] - windows[None, :], 0)
+    # (dates, actifs, fenêtres)
+    n = counts[t][:, :, None] - np.moveaxis(counts[lag], 1, 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sma = (sums[t][:, :, None] - np.moveaxis(sums[lag], 1, 2)) / n + ref[..., None]
+    sma = np.where(n > 0, sma, np.nan)
+    return sma.reshape(np.shape(close) + (len(windows),))
+
+
+def _ema_matrix(x: np.ndarray, spans) -> np.ndarray:
+    """
+    EMA (adjust=False) de chaque colonne de `x` pour chaque span -> tableau
+    (dates, *x.shape[1:], spans), toutes les colonnes à la fois pour chaque span.
+
+    Comme `ewm(adjust=False)`, la récursion démarre à la première valeur non
+    manquante de chaque colonne (les NaN de tête restent NaN ; séries sans
+    trou ensuite). Le masque min_periods est appliqué par l'appelant.
+    """
+    x = np.asarray(x, dtype=float)
+    started = np.logical_or.accumulate(~np.isnan(x), axis=0)
+    # NaN de tête remplacés par la première valeur : l'EMA y reste constante
+    first = np.take_along_axis(x, started.argmax(axis=0)[None], axis=0)
+    x = np.where(started, x, first)
+
+    # Récursion y_t = alpha * x_t + (1 - alpha) * y_{t-1}, y_0 = x_0 : filtre IIR
+    # (scipy, en C) le long de l'axe du temps placé en dernier (contigu)
+    x_t = np.ascontiguousarray(np.moveaxis(x, 0, -1))
+    out = np.empty(x.shape + (len(spans),))
+    for j, span in enumerate(spans):
+        alpha = 2.0 / (float(span) + 1.0)
+        y, _ = lfilter([alpha], [1.0, alpha - 1.0], x_t, axis=-1, zi=(1.0 - alpha) * x_t[..., :1])
+        out[..., j] = np.moveaxis(y, -1, 0)
+    out[~started] = np.nan
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Noyau commun : positions -> rendements -> valeur du portefeuille
+# ---------------------------------------------------------------------------
+
+def signal_to_equity(
+    raw_position,
+    returns,
     initial_capital: float = 1_000.0,
-) -> pd.Series:
+    cost_bps: float = 0.0,
+    initial_position: float = 0.0,
+):
     """
-    Transforme une série de rendements en courbe de valeur de portefeuille.
-    Garantit que le résultat est une Series 1D.
+    Transforme des positions brutes (décidées à la clôture du jour t) en
+    rendements et en valeur de portefeuille, sans DataFrame intermédiaire.
+
+    - la position du jour t-1 est appliquée au rendement du jour t (pas de
+      look-ahead) ; `initial_position` est la position tenue le premier jour ;
+    - `cost_bps` : coût de transaction (points de base) par unité de
+      position échangée ;
+    - un rendement manquant (NaN) compte pour 0 dans la valeur du portefeuille.
+
+    `raw_position` peut être un vecteur (dates) ou une matrice (dates x
+    variantes) ; `returns` est alors diffusé sur les colonnes.
+
+    Returns
+    -------
+    position, strategy_returns, equity : np.ndarray (même forme que raw_position)
     """
-    r = pd.Series(returns, copy=True)  # s'assure que c'est une Series
-    r = r.fillna(0.0)
+    raw = np.asarray(raw_position, dtype=float)
+    r = np.asarray(returns, dtype=float)
+    if raw.ndim == 2 and r.ndim == 1:
+        r = r[:, None]
 
-    equity = initial_capital * (1.0 + r).cumprod()
-    equity.name = "strategy_equity"
-    return equity
+    position = np.empty_like(raw)
+    position[0] = initial_position
+    position[1:] = raw[:-1]
 
+    strategy_returns = position * r
+    if cost_bps:
+        turnover = np.abs(np.diff(position, axis=0, prepend=0.0))
+        strategy_returns -= turnover * (cost_bps / 10_000.0)
 
-def backtest_buy_and_hold(
+    equity = np.nan_to_num(strategy_returns) + 1.0
+    np.cumprod(equity, axis=0, out=equity)
+    equity *= initial_capital
+    return position, strategy_returns, equity
+
+
+# ---------------------------------------------------------------------------
+# Registre des stratégies : chacune ne produit qu'un vecteur de positions
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Strategy:
+    name: str
+    short: str                                    # libellé court, ex: "SMA({window})"
+    signal: Callable[..., np.ndarray]             # (close, **params) -> positions brutes
+    defaults: dict = field(default_factory=dict)
+    warmup: Callable[..., int] = lambda **params: 0   # lignes de chauffe retirées du résultat
+    initial_position: float = 0.0
+
+    def label(self, params=None) -> str:
+        return self.short.format(**{**self.defaults, **(params or {})})
+
+
+STRATEGIES: dict = {}
+
+
+def register_strategy(name, short, warmup=None, initial_position=0.0, **defaults):
+    """
+    Décorateur : enregistre une fonction de signal sous `name` (clé des pages).
+    La fonction reçoit les clôtures en vecteur (dates) ou en matrice (dates x
+    actifs, mode batch) et renvoie des positions de même forme.
+    """
+    def decorator(signal):
+        STRATEGIES[name] = Strategy(
+            name, short, signal, defaults,
+            warmup or (lambda **params: 0), initial_position,
+        )
+        return signal
+    return decorator
+
+
+@register_strategy("Buy & Hold", short="B&H", initial_position=1.0)
+def buy_and_hold_signal(close):
+    """On achète au début et on garde jusqu'à la fin."""
+    return np.ones(np.shape(close))
+
+
+@register_strategy("Momentum SMA", short="SMA({window})", window=50)
+def momentum_sma_signal(close, window=50):
+    """
+    Investi si Close_t > SMA_t(window), cash sinon. SMA avec min_periods=1
+    (tolérance relative : un prix égal à sa SMA reste "non investi" malgré
+    l'arrondi des sommes cumulées).
+    """
+    sma = _sma_matrix(close, np.array([int(window)]))[..., 0]
+    return (close - sma) > 1e-12 * np.abs(close)
+
+
+@register_strategy(
+    "MACD", short="MACD({fast},{slow},{signal})",
+    # EMA fast/slow (min_periods), puis EMA du MACD, et pas de rendement la 1re ligne
+    warmup=lambda fast=12, slow=26, signal=9: max(max(fast, slow) + signal - 2, 1),
+    fast=12, slow=26, signal=9,
+)
+def macd_signal(close, fast=12, slow=26, signal=9):
+    """Investi quand la ligne MACD est au-dessus de sa ligne de signal."""
+    fast, slow, signal = int(fast), int(slow), int(signal)
+    # Index des dates, diffusé sur les colonnes si `close` est une matrice
+    t = np.arange(len(close)).reshape((-1,) + (1,) * (np.ndim(close) - 1))
+    ema = _ema_matrix(close, [fast, slow])
+    macd = np.where(t >= max(fast, slow) - 1, ema[..., 0] - ema[..., 1], np.nan)
+    signal_line = _ema_matrix(macd, [signal])[..., 0]
+    signal_line[np.broadcast_to(t < max(fast, slow) + signal - 2, signal_line.shape)] = np.nan
+    return macd > signal_line
+
+
+# Colonnes renvoyées par run_strategy
+RESULT_COLUMNS = ["Close", "position", "strategy_return", "strategy_equity", "price_norm", "strategy_norm"]
+
+def run_strategy(
     data: pd.DataFrame,
+    strategy: str,
+    params=None,
     initial_capital: float = 1_000.0,
+    cost_bps: float = 0.0,
 ) -> pd.DataFrame:
     """
-    Stratégie Buy & Hold : on achète au début et on garde jusqu'à la fin.
+    Backtest d'une stratégie du registre sur `data` (colonnes 'Close' et
+    'return', voir get_price_history).
+
+    Returns
+    -------
+    pd.DataFrame
+        Colonnes 'Close', 'position', 'strategy_return', 'strategy_equity',
+        'price_norm', 'strategy_norm' (lignes de chauffe retirées).
     """
-    strategy_returns = pd.Series(data["return"], index=data.index)
+    spec = STRATEGIES[strategy]
+    params = {**spec.defaults, **(params or {})}
+
+    close = data["Close"].to_numpy(dtype=float)
+    start = spec.warmup(**params)
+    if start >= len(close):
+        # Historique plus court que la chauffe : aucune ligne exploitable
+        return pd.DataFrame(columns=RESULT_COLUMNS, index=data.index[:0], dtype=float)
+
+    raw_position = spec.signal(close, **params)
+    position, strategy_returns, equity = signal_to_equity(
+        raw_position, data["return"].to_numpy(dtype=float),
+        initial_capital, cost_bps, spec.initial_position,
+    )
+
+    if start:
+        # La chauffe est retirée : la courbe repart du capital initial à la 1re ligne gardée
+        close, position, strategy_returns = close[start:], position[start:], strategy_returns[start:]
+        equity = equity[start:] / equity[start - 1] * initial_capital
 
-    equity = _equity_curve_from_returns(strategy_returns, initial_capital)
+    return pd.DataFrame(
+        {
+            "Close": close,
+            "position": position,
+            "strategy_return": strategy_returns,
+            "strategy_equity": equity,
+            "price_norm": close / close[0],
+            "strategy_norm": equity / initial_capital,
+        },
+        index=data.index[start:],
+    )
 
-    result = pd.DataFrame(index=data.index)
-    result["Close"] = data["Close"]
-    result["strategy_equity"] = equity
-    result["price_norm"] = result["Close"] / result["Close"].iloc[0]
-    result["strategy_norm"] = result["strategy_equity"] / initial_capital
-    result["strategy_return"] = strategy_returns
-    return result
+
+def backtest_buy_and_hold(
+    data: pd.DataFrame,
+    initial_capital: float = 1_000.0,
+) -> pd.DataFrame:
+    """
+    Stratégie Buy & Hold : on achète au début et on garde jusqu'à la fin.
+    """
+    return run_strategy(data, "Buy & Hold", initial_capital=initial_capital)
 
 
 def backtest_momentum_sma(
@@ -57,69 +262,268 @@ def backtest_momentum_sma(
     On applique la position du jour t-1 au rendement du jour t
     pour éviter le look-ahead.
     """
-    close = data["Close"]
-    returns = data["return"]
+    return run_strategy(data, "Momentum SMA", {"window": window}, initial_capital)
+
+
+def backtest_macd(data, fast=12, slow=26, signal=9, initial_capital=1000.0):
+    """
+    Stratégie MACD classique :
+    - Achat quand la ligne MACD croise au-dessus du Signal.
+    - Vente (Cash) quand la ligne MACD croise en-dessous du Signal.
+    Les lignes de chauffe (EMA pas encore définies) sont retirées.
+    """
+    return run_strategy(data, "MACD", {"fast": fast, "slow": slow, "signal": signal}, initial_capital)
+
+
+def backtest_batch(
+    closes: pd.DataFrame,
+    strategy: str,
+    params=None,
+    initial_capital: float = 1_000.0,
+    cost_bps: float = 0.0,
+    periods_per_year: int = 252,
+    risk_free_rate: float = 0.0,
+    with_results: bool = True,
+):
+    """
+    Backtest d'une stratégie du registre sur toute une matrice de clôtures
+    (dates x tickers, NaN quand un actif ne cote pas) en un seul calcul.
 
-    sma = close.rolling(window=window, min_periods=1).mean()
+    Chaque colonne est d'abord tassée sur ses propres dates de cotation
+    (comme `get_price_history` : la première ligne ne sert que de base au
+    premier rendement), puis signal et noyau tournent sur la matrice. Les
+    résultats sont identiques à `run_strategy` ticker par ticker.
 
-    # Signal brut: 1 si prix > SMA, 0 sinon
-    raw_position = (close > sma).astype(float)
+    Returns
+    -------
+    results : dict
+        {ticker: DataFrame au format de `run_strategy`} ; vide si
+        with_results=False (seul le tableau des métriques est utile).
+    summary : pd.DataFrame
+        Une ligne par ticker (métriques de `summarize_equity_matrix`).
+    """
+    from logic.metrics import summarize_equity_matrix
 
-    # position du jour t-1 appliquée au rendement du jour t
-    position = raw_position.shift(1).fillna(0.0)
+    spec = STRATEGIES[strategy]
+    params = {**spec.defaults, **(params or {})}
 
-    # Rendements de la stratégie (on force en Series)
-    strategy_returns = pd.Series(position * returns, index=data.index)
+    matrix = closes.to_numpy(dtype=float)
+    valid = ~np.isnan(matrix)
+    lengths = valid.sum(axis=0)
+    keep = lengths >= 2
+    tickers = list(closes.columns[keep])
+    if not tickers:
+        return {}, pd.DataFrame()
+    matrix, valid, lengths = matrix[:, keep], valid[:, keep], lengths[keep]
 
-    equity = _equity_curve_from_returns(strategy_returns, initial_capital)
+    # Tassement : les dates cotées de chaque colonne en tête, NaN en fin de colonne
+    order = np.argsort(~valid, axis=0, kind="stable")
+    dense = np.take_along_axis(matrix, order, axis=0)[: lengths.max()]
+    row_of = order[: len(dense)]
 
-    result = pd.DataFrame(index=data.index)
-    result["Close"] = close
-    result["SMA"] = sma
-    result["position"] = position
-    result["strategy_equity"] = equity
-    result["price_norm"] = result["Close"] / result["Close"].iloc[0]
-    result["strategy_norm"] = result["strategy_equity"] / initial_capital
-    result["strategy_return"] = strategy_returns
+    close = dense[1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = dense[1:] / dense[:-1] - 1.0
 
-    return result
+    start = spec.warmup(**params)
+    if start >= len(close):
+        return {}, pd.DataFrame()
 
-def backtest_macd(data, fast=12, slow=26, signal=9, initial_capital=1000.0):
+    raw_position = spec.signal(close, **params)
+    position, strategy_returns, equity = signal_to_equity(
+        raw_position, returns, initial_capital, cost_bps, spec.initial_position,
+    )
+
+    if start:
+        close, position, strategy_returns = close[start:], position[start:], strategy_returns[start:]
+        equity = equity[start:] / equity[start - 1] * initial_capital
+
+    # Après la fin d'une colonne : pas de rendement, valeur figée
+    strategy_returns[np.isnan(close)] = np.nan
+    summary = summarize_equity_matrix(
+        equity, strategy_returns, initial_capital, periods_per_year, risk_free_rate
+    )
+    summary.index = pd.Index(tickers, name="ticker")
+    summary = summary[lengths - 1 - start > 0]
+    if not with_results:
+        return {}, summary
+
+    results = {}
+    for j, ticker in enumerate(tickers):
+        n = lengths[j] - 1 - start
+        if n <= 0:
+            continue
+        c, e = close[:n, j], equity[:n, j]
+        results[ticker] = pd.DataFrame(
+            {
+                "Close": c,
+                "position": position[:n, j],
+                "strategy_return": strategy_returns[:n, j],
+                "strategy_equity": e,
+                "price_norm": c / c[0],
+                "strategy_norm": e / initial_capital,
+            },
+            index=closes.index[row_of[1 + start:1 + start + n, j]],
+        )
+    return results, summary
+
+
+def sweep_momentum_sma(
+    data: pd.DataFrame,
+    windows,
+    initial_capital: float = 1_000.0,
+    periods_per_year: int = 252,
+    risk_free_rate: float = 0.0,
+    return_equity: bool = False,
+):
     """
-    Stratégie MACD classique :
-    - Achat quand la ligne MACD croise au-dessus du Signal.
-    - Vente (Cash) quand la ligne MACD croise en-dessous du Signal.
+    Backtest Momentum SMA pour tout un vecteur de fenêtres en une passe.
+
+    Même règle que `backtest_momentum_sma` (position du jour t-1 appliquée au
+    rendement du jour t), mais les SMA, positions et courbes de valeur sont
+    calculées en matrices (dates x fenêtres) au lieu d'un DataFrame par
+    fenêtre.
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        Une ligne par fenêtre (index 'window') : métriques de
+        `summarize_equity_matrix` + 'exposure' (part du temps investi) et
+        'trades' (nombre de changements de position).
+    equity : pd.DataFrame
+        Seulement si return_equity=True : courbes de valeur (dates x fenêtres).
+    """
+    from logic.metrics import summarize_equity_matrix
+
+    windows = np.unique(np.asarray(windows, dtype=int))
+    if windows.size == 0 or windows[0] < 1:
+        raise ValueError("windows must be a non-empty list of positive integers")
+
+    close = data["Close"].to_numpy(dtype=float)
+    returns = data["return"].to_numpy(dtype=float)
+
+    sma = _sma_matrix(close, windows)
+
+    # Même signal que momentum_sma_signal, une colonne par fenêtre
+    raw_position = (close[:, None] - sma) > 1e-12 * np.abs(close[:, None])
+    position, strategy_returns, equity = signal_to_equity(raw_position, returns, initial_capital)
+
+    summary = summarize_equity_matrix(
+        equity, strategy_returns, initial_capital, periods_per_year, risk_free_rate
+    )
+    summary.index = pd.Index(windows, name="window")
+    summary["exposure"] = position.mean(axis=0)
+    summary["trades"] = np.abs(np.diff(position, axis=0)).sum(axis=0).astype(int)
+
+    if return_equity:
+        return summary, pd.DataFrame(equity, index=data.index, columns=summary.index)
+    return summary
+
+
+def grid_backtest_macd(
+    data: pd.DataFrame,
+    fasts,
+    slows,
+    signals,
+    initial_capital: float = 1_000.0,
+    periods_per_year: int = 252,
+    risk_free_rate: float = 0.0,
+    rank_by: str = "sharpe_ratio",
+    max_columns: int = 2048,
+) -> pd.DataFrame:
+    """
+    Backtest MACD sur toute une grille (fast, slow, signal), fast < slow.
+
+    Mêmes règles que `backtest_macd` (EMA adjust=False avec min_periods,
+    position du jour t-1, métriques calculées après la période de chauffe) :
+    - une EMA par span distinct de fast / slow, calculée une seule fois ;
+    - les EMA de signal de toutes les paires (fast, slow) et de tous les
+      spans de signal dans une même récursion, par blocs de `max_columns`
+      combinaisons pour borner la mémoire.
+
+    Returns
+    -------
+    pd.DataFrame
+        Une ligne par combinaison : 'rank' (1 = meilleure selon `rank_by`),
+        'fast', 'slow', 'signal', métriques de `summarize_equity_matrix`,
+        'exposure' (part du temps investi) et 'trades'.
+    """
+    from logic.metrics import summarize_equity_matrix
+
+    fasts = np.unique(np.asarray(fasts, dtype=int))
+    slows = np.unique(np.asarray(slows, dtype=int))
+    signals = np.unique(np.asarray(signals, dtype=int))
+    if any(v.size and v[0] < 1 for v in (fasts, slows, signals)):
+        raise ValueError("MACD spans must be positive integers")
+
+    pairs = np.array([(f, s) for f in fasts for s in slows if f < s])
+    if len(pairs) == 0 or signals.size == 0:
+        return pd.DataFrame()
+
+    close = data["Close"].to_numpy(dtype=float)
+    market_return = np.nan_to_num(data["Close"].pct_change().to_numpy(dtype=float))
+    T = len(close)
+    t_index = np.arange(T)
+
+    # EMA de prix : une seule fois par span distinct, puis masque min_periods
+    spans = np.union1d(fasts, slows)
+    ema = _ema_matrix(close, spans)
+    ema[t_index[:, None] < spans[None, :] - 1] = np.nan
+    col = {int(span): i for i, span in enumerate(spans)}
+
+    pairs_per_block = max(1, max_columns // len(signals))
+    tables = []
+    for lo in range(0, len(pairs), pairs_per_block):
+        block = pairs[lo:lo + pairs_per_block]
+        macd = ema[:, [col[f] for f in block[:, 0]]] - ema[:, [col[s] for s in block[:, 1]]]
+
+        # Signal : EMA du MACD pour chaque span de signal -> (dates, paires, signaux)
+        signal_line = _ema_matrix(macd, signals)
+        raw_position = (macd[:, :, None] > signal_line).reshape(T, -1)
+        n_cols = raw_position.shape[1]
+        start = ((block.max(axis=1) - 1)[:, None] + signals[None, :] - 1).ravel()
+        raw_position &= t_index[:, None] >= start[None, :]
+
+        # Position du jour t-1 sur le rendement du jour t. Avant la fin de la
+        # chauffe la position est nulle : ces lignes (retirées par le dropna de
+        # backtest_macd) ne comptent que via n_obs.
+        strategy_returns = np.zeros((T, n_cols))
+        np.multiply(raw_position[:-1], market_return[1:, None], out=strategy_returns[1:])
+        n_obs = T - np.maximum(start, 1)
+
+        equity = np.add(strategy_returns, 1.0)
+        np.cumprod(equity, axis=0, out=equity)
+        equity *= initial_capital
+
+        table = summarize_equity_matrix(
+            equity, strategy_returns, initial_capital, periods_per_year, risk_free_rate, n_obs=n_obs
+        )
+        table.insert(0, "fast", np.repeat(block[:, 0], len(signals)))
+        table.insert(1, "slow", np.repeat(block[:, 1], len(signals)))
+        table.insert(2, "signal", np.tile(signals, len(block)))
+        table["exposure"] = raw_position[:-1].sum(axis=0) / n_obs
+        table["trades"] = (raw_position[1:-1] != raw_position[:-2]).sum(axis=0)
+        tables.append(table)
+
+    result = pd.concat(tables, ignore_index=True)
+    ascending = rank_by == "annualized_volatility"
+    result = result.sort_values(rank_by, ascending=ascending, na_position="last", kind="stable")
+    result.insert(0, "rank", np.arange(1, len(result) + 1))
+    return result.reset_index(drop=True)
+
+
+def macd_heatmap(grid: pd.DataFrame, metric: str = "sharpe_ratio", signal=None) -> pd.DataFrame:
+    """
+    Coupe 2-D de `grid_backtest_macd` : fast en lignes, slow en colonnes.
+    `signal` fixe le span de signal (par défaut celui de la meilleure ligne).
     """
-    df = data.copy()
-    
-    # Calcul MACD
-    # EMA Fast
-    k_fast = df['Close'].ewm(span=fast, adjust=False, min_periods=fast).mean()
-    # EMA Slow
-    k_slow = df['Close'].ewm(span=slow, adjust=False, min_periods=slow).mean()
-    
-    df['macd_line'] = k_fast - k_slow
-    df['signal_line'] = df['macd_line'].ewm(span=signal, adjust=False, min_periods=signal).mean()
-    
-    # Logique de Trading (1 = Investi, 0 = Cash)
-    # Si MACD > Signal => 1, Sinon => 0
-    df['position'] = 0
-    df.loc[df['macd_line'] > df['signal_line'], 'position'] = 1
-    
-    # Calcul des retours
-    df['market_return'] = df['Close'].pct_change()
-    # On shift la position d'un jour (on trade à l'ouverture du lendemain du signal)
-    df['strategy_return'] = df['position'].shift(1) * df['market_return']
-    
-    # Equity Curve
-    df['strategy_norm'] = (1 + df['strategy_return']).cumprod()
-    # Ajustement avec capital
-    df['strategy_equity'] = df['strategy_norm'] * initial_capital
-    
-    # Nettoyage NaN
-    df.dropna(inplace=True)
-    
-    return df
+    if grid.empty:
+        return pd.DataFrame()
+    if signal is None:
+        signal = int(grid["signal"].iloc[0])
+    sub = grid[grid["signal"] == signal]
+    return sub.pivot(index="fast", columns="slow", values=metric)
+
 
 if __name__ == "__main__":
     # Petit test rapide sur l'actif par défaut (Air Liquide)
@@ -135,3 +539,11 @@ if __name__ == "__main__":
     print(f"Final equity: {mom['strategy_equity'].iloc[-1]:.2f}")
     print(mom.tail())
 
+    sweep = sweep_momentum_sma(df, windows=range(10, 301))
+    print(f"\n=== Momentum SMA sweep (10-300) on {DEFAULT_TICKER} ===")
+    print(sweep.sort_values("sharpe_ratio", ascending=False).head(10))
+
+    grid = grid_backtest_macd(df, fasts=range(4, 21), slows=range(15, 61), signals=range(3, 16))
+    print(f"\n=== MACD grid ({len(grid)} combinations) on {DEFAULT_TICKER} ===")
+    print(grid.head(10))
+
@@ -0,0 +1,243 @@
+"""
+Optimisation walk-forward des stratégies du registre (`strategies_single`).
+
+Les paramètres sont choisis sur une fenêtre d'apprentissage puis évalués sur
+la fenêtre de test qui suit, jamais sur les données qui ont servi à les
+choisir. Les fenêtres glissent (rolling : taille d'apprentissage fixe) ou
+s'allongent (anchored : apprentissage depuis le début de l'historique).
+
+Chaque fold est indépendant : ils sont répartis sur un ProcessPoolExecutor.
+La matrice des clôtures (dates x tickers) est copiée une seule fois dans un
+segment de mémoire partagée ; les processus n'en reçoivent que le nom et ne
+copient que les lignes de leur fold. Le choix des paramètres se fait par
+ticker (chaque actif garde ses meilleurs paramètres d'apprentissage), chaque
+combinaison étant backtestée sur tous les tickers en un appel
+`backtest_batch`.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from logic.metrics import max_drawdown, sharpe_ratio, summarize_equity_matrix
+from logic.strategies_single import STRATEGIES, backtest_batch
+
+# Métriques où une valeur plus faible est meilleure
+LOWER_IS_BETTER = {"annualized_volatility"}
+
+
+@dataclass
+class Fold:
+    index: int
+    train_start: int   # lignes de la matrice des clôtures, [start, end)
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+def walk_forward_splits(n_rows, train_size, test_size, step=None, anchored=False) -> list:
+    """
+    Découpe `n_rows` dates en folds (apprentissage, test) successifs.
+
+    step : décalage entre deux folds (par défaut test_size). Les fenêtres de
+    test ne doivent pas se chevaucher pour pouvoir être recollées.
+    anchored : l'apprentissage commence toujours à la première date.
+    """
+    step = step or test_size
+    if train_size < 1 or test_size < 1:
+        raise ValueError("train_size and test_size must be positive")
+    if step < test_size:
+        raise ValueError("step must be >= test_size (test folds must not overlap)")
+
+    folds = []
+    test_start = train_size
+    while test_start < n_rows:
+        test_end = min(test_start + test_size, n_rows)
+        train_start = 0 if anchored else test_start - train_size
+        folds.append(Fold(len(folds), train_start, test_start, test_start, test_end))
+        test_start += step
+    return folds
+
+
+def param_combinations(param_grid) -> list:
+    """{'fast': [5, 12], 'slow': [26, 40]} -> liste de dicts (produit cartésien)."""
+    if not param_grid:
+        return [{}]
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+
+def _run_fold(shm_name, shape, columns, fold, strategy, combos, metric, initial_capital, cost_bps):
+    """
+    Un fold : recherche des paramètres sur l'apprentissage (par ticker), puis
+    rendements hors échantillon sur le test. Exécuté dans un processus du pool.
+    """
+    shm = SharedMemory(name=shm_name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        # Copie des seules lignes du fold : plus aucune vue sur le segment ensuite
+        window = pd.DataFrame(
+            matrix[fold.train_start:fold.test_end].copy(),
+            index=pd.RangeIndex(fold.train_start, fold.test_end), columns=columns,
+        )
+        del matrix
+    finally:
+        shm.close()
+
+    train = window.loc[:fold.train_end - 1]
+    sign = -1.0 if metric in LOWER_IS_BETTER else 1.0
+    scores = pd.DataFrame(np.nan, index=range(len(combos)), columns=columns)
+    for k, params in enumerate(combos):
+        _, summary = backtest_batch(train, strategy, params, initial_capital, cost_bps, with_results=False)
+        if not summary.empty:
+            scores.loc[k, summary.index] = sign * summary[metric].to_numpy(dtype=float)
+
+    # Meilleure combinaison par ticker (tickers sans aucun score exclus du test)
+    values = scores.to_numpy()
+    scored = ~np.isnan(values).all(axis=0)
+    best = pd.Series(np.nanargmax(values[:, scored], axis=0), index=scores.columns[scored])
+
+    rows, oos_returns = [], {}
+    for k, tickers in best.groupby(best).groups.items():
+        params = combos[int(k)]
+        # Test : le backtest démarre à l'apprentissage (indicateurs déjà chauffés,
+        # aucune donnée postérieure), seules les lignes de test sont gardées
+        results, _ = backtest_batch(window[list(tickers)], strategy, params, initial_capital, cost_bps)
+        for ticker, res in results.items():
+            r = res["strategy_return"][res.index >= fold.test_start]
+            if r.empty:
+                continue
+            oos_returns[ticker] = r
+            rows.append({
+                "fold": fold.index,
+                "ticker": ticker,
+                "params": params,
+                "train_score": sign * scores.loc[int(k), ticker],
+                "test_return": float((1.0 + r.fillna(0.0)).prod() - 1.0),
+                "test_sharpe": sharpe_ratio(r),
+                "test_max_drawdown": max_drawdown((1.0 + r.fillna(0.0)).cumprod()),
+                "test_days": int(r.notna().sum()),
+            })
+    return rows, oos_returns
+
+
+def walk_forward(
+    closes: pd.DataFrame,
+    strategy: str,
+    param_grid: dict,
+    train_size: int = 756,
+    test_size: int = 126,
+    step=None,
+    anchored: bool = False,
+    metric: str = "sharpe_ratio",
+    initial_capital: float = 1_000.0,
+    cost_bps: float = 0.0,
+    max_workers=None,
+):
+    """
+    Walk-forward d'une stratégie du registre sur une matrice de clôtures
+    (dates x tickers, NaN quand un actif ne cote pas, ex: `get_close_matrix`).
+
+    Parameters
+    ----------
+    param_grid : dict
+        {paramètre: valeurs candidates}, ex: {'window': range(10, 201, 10)}.
+    train_size, test_size, step : int
+        Tailles en lignes (dates) de la matrice ; 756 / 126 ~ 3 ans / 6 mois.
+    metric : str
+        Colonne de `summarize_equity_matrix` maximisée sur l'apprentissage
+        (minimisée pour 'annualized_volatility').
+    max_workers : int | None
+        Processus du pool (None = nombre de cœurs ; 1 = dans ce processus).
+
+    Returns
+    -------
+    equity : pd.DataFrame
+        Valeur hors échantillon recollée fold après fold (dates x tickers).
+    folds : pd.DataFrame
+        Une ligne par (fold, ticker) : dates, paramètres retenus, score
+        d'apprentissage, statistiques de test.
+    summary : pd.DataFrame
+        Métriques de la courbe hors échantillon complète, par ticker.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}")
+    combos = param_combinations(param_grid)
+    folds = walk_forward_splits(len(closes), train_size, test_size, step, anchored)
+    if not folds or closes.empty:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    matrix = closes.to_numpy(dtype=np.float64)
+    columns = list(closes.columns)
+    shm = SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        np.ndarray(matrix.shape, dtype=np.float64, buffer=shm.buf)[:] = matrix
+        args = (shm.name, matrix.shape, columns)
+        extra = (strategy, combos, metric, initial_capital, cost_bps)
+
+        workers = max_workers or os.cpu_count() or 1
+        if workers == 1 or len(folds) == 1:
+            outputs = [_run_fold(*args, fold, *extra) for fold in folds]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(folds))) as pool:
+                futures = [pool.submit(_run_fold, *args, fold, *extra) for fold in folds]
+                outputs = [f.result() for f in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    rows, pieces = [], {}
+    for fold, (fold_rows, oos_returns) in zip(folds, outputs):
+        for row in fold_rows:
+            row.update({
+                "train_start": closes.index[fold.train_start],
+                "train_end": closes.index[fold.train_end - 1],
+                "test_start": closes.index[fold.test_start],
+                "test_end": closes.index[fold.test_end - 1],
+            })
+        rows.extend(fold_rows)
+        for ticker, r in oos_returns.items():
+            pieces.setdefault(ticker, []).append(r)
+
+    if not rows:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    # Rendements de test recollés (folds disjoints), puis une seule courbe par ticker
+    first_test = folds[0].test_start
+    returns = pd.DataFrame(
+        {t: pd.concat(p) for t, p in pieces.items()}, index=pd.RangeIndex(first_test, len(closes))
+    )
+    returns = returns[[t for t in columns if t in returns.columns]]
+    equity = initial_capital * (1.0 + returns.fillna(0.0)).cumprod()
+
+    summary = summarize_equity_matrix(equity.to_numpy(), returns.to_numpy(), initial_capital)
+    summary.index = pd.Index(returns.columns, name="ticker")
+    equity.index = closes.index[first_test:]
+
+    folds_df = pd.DataFrame(rows)[[
+        "fold", "ticker", "train_start", "train_end", "test_start", "test_end", "params",
+        "train_score", "test_return", "test_sharpe", "test_max_drawdown", "test_days",
+    ]]
+    return equity, folds_df, summary
+
+
+if __name__ == "__main__":
+    import time
+    from data.data_single_asset import get_close_matrix
+
+    closes, failures = get_close_matrix(["AI.PA", "MC.PA", "OR.PA", "SAN.PA", "TTE.PA"], years=15)
+    start = time.perf_counter()
+    equity, folds, summary = walk_forward(
+        closes, "Momentum SMA", {"window": range(10, 201, 10)}, train_size=756, test_size=126,
+    )
+    print(f"=== Walk-forward Momentum SMA ({len(folds['fold'].unique())} folds, "
+          f"{time.perf_counter() - start:.1f}s) ===")
+    print(summary)
+    print(folds.tail(10))
@@ -163,6 +163,20 @@ def render_prediction_chart(ticker_data_map, show_ci=True, visible_years=1):
         final_chart = style_chart(combined, 'Price')
         st.altair_chart(final_chart, use_container_width=True)
     
+def render_macd_heatmap(heat, metric_label):
+    """Heatmap fast x slow d'une coupe de la grille MACD (voir `macd_heatmap`)."""
+    if heat is None or heat.empty:
+        st.info("No MACD combination to display.")
+        return
+    df = heat.stack().rename('Value').reset_index()
+    chart = alt.Chart(df).mark_rect().encode(
+        x=alt.X('slow:O', title='Slow'),
+        y=alt.Y('fast:O', title='Fast', sort='descending'),
+        color=alt.Color('Value:Q', scale=alt.Scale(scheme='redyellowgreen'), legend=alt.Legend(title=None)),
+        tooltip=['fast', 'slow', alt.Tooltip('Value', format='.3f', title=metric_label)]
+    )
+    st.altair_chart(style_chart(chart, metric_label), use_container_width=True)
+
 def render_metric_card_html(item, rankings):
     s = item['summary']
     border_c = item['color']
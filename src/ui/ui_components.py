@@ -1,8 +1,33 @@
 import streamlit as st
+import uuid
 from datetime import datetime, timedelta, timezone
 
 from data.database import get_active_tickers_db, add_active_ticker_db, remove_active_ticker_db
 from data.data_single_asset import get_price_history # Need simple fetch for tape price
+from data.write_queue import get_write_queue
+
+def get_session_id():
+    """Identifiant stable de la session Streamlit (rattache les écritures en file à leur session)."""
+    if 'session_id' not in st.session_state:
+        st.session_state['session_id'] = uuid.uuid4().hex
+    return st.session_state['session_id']
+
+# Attente maximale (s) d'une écriture dont l'utilisateur doit voir le résultat
+WRITE_TIMEOUT = 5.0
+
+def submit_and_wait(fn, *args, timeout=WRITE_TIMEOUT, **kwargs):
+    """
+    Passe par la file d'écritures (écritures sérialisées, pas de "database is
+    locked") mais attend le résultat : renvoie (True, résultat) ou
+    (False, message d'erreur).
+    """
+    future = get_write_queue().submit(fn, *args, session=get_session_id(), **kwargs)
+    try:
+        return True, future.result(timeout=timeout)
+    except TimeoutError:
+        return False, "Database busy, please try again."
+    except Exception as e:
+        return False, str(e)
 
 def render_theme_toggle():
     if 'is_dark_mode' not in st.session_state:
@@ -94,14 +119,27 @@ def apply_theme_and_css(is_dark_mode):
     """
     st.markdown(css, unsafe_allow_html=True)
 
-def render_ticker_tape(prices_dict):
+def format_quote_age(age_seconds):
+    if age_seconds is None: return ""
+    if age_seconds < 60: return "<1m"
+    if age_seconds < 3600: return f"{int(age_seconds // 60)}m"
+    return f"{int(age_seconds // 3600)}h"
+
+def render_ticker_tape(prices_dict, ages=None):
+    """
+    prices_dict: {ticker: prix} (None = pas encore reçu)
+    ages: {ticker: âge du prix en secondes}, affiché à côté du prix si fourni
+    """
     if not prices_dict:
         html_content = '<div class="ticker-container"><div class="ticker-item">Loading data...</div></div>'
     else:
         items_html = ""
         for ticker, price in prices_dict.items():
             sym = ticker.replace("^", "")
-            items_html += f'<div class="ticker-item">{sym}: {price:.2f}</div>'
+            price_txt = "..." if price is None else f"{price:.2f}"
+            age_txt = format_quote_age((ages or {}).get(ticker))
+            age_html = f' <span style="opacity:0.6; font-size:0.8em;">{age_txt}</span>' if age_txt else ""
+            items_html += f'<div class="ticker-item">{sym}: {price_txt}{age_html}</div>'
         html_content = f'<div class="ticker-container">{items_html}</div>'
     st.markdown(html_content, unsafe_allow_html=True)
 
@@ -2,9 +2,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-import time
 from logic.portfolio_logic import (
-    get_portfolio_data, 
+    load_portfolio_prices, 
     calculate_portfolio_performance, 
     compute_correlation_matrix, 
     calculate_asset_metrics_detailed,
@@ -13,12 +12,52 @@ from logic.portfolio_logic import (
 from logic.optimization import get_optimized_weights, simulate_efficient_frontier
 from ui.single_components import COLORS, get_medal
 # Import de la nouvelle fonction delete_portfolio_db
-from data.database import save_portfolio_db, get_latest_portfolios, get_active_tickers_db, delete_portfolio_db
+from data.database import (
+    save_portfolio_db, get_latest_portfolios, get_active_tickers_db, delete_portfolio_db,
+    get_portfolios_holding, get_top_portfolios, get_held_symbols
+)
+from data.write_queue import get_write_queue
+from ui.ui_components import get_session_id, submit_and_wait
+
+def warn_failed_tickers(failures, loaded=()):
+    # Un ticker en échec mais présent dans les prix a été servi depuis le cache
+    stale = sorted(t for t in failures if t in loaded)
+    missing = sorted(t for t in failures if t not in loaded)
+    if missing:
+        st.warning("No data for: " + ", ".join(missing) + ". They are excluded from the calculation.")
+    if stale:
+        st.warning("Could not refresh: " + ", ".join(stale) + ". Using cached prices.")
+
+FEED_SORTS = {"Latest": None, "Top Sharpe": "sharpe", "Top Return": "total_return", "Lowest Vol": "volatility"}
+
+def load_community_feed(key, limit=10):
+    """Filtres du feed (actif détenu, tri) ; la requête est faite en SQL via portfolio_holdings."""
+    # Read-your-writes : on attend les écritures encore en file de cette session
+    # seulement, avant toute lecture (liste des actifs détenus comprise)
+    get_write_queue().sync(get_session_id())
+
+    c_hold, c_sort = st.columns(2)
+    with c_hold:
+        holding = st.selectbox("Holding", ["All"] + get_held_symbols(), key=f"feed_holding_{key}")
+    with c_sort:
+        sort = st.selectbox("Sort by", list(FEED_SORTS.keys()), key=f"feed_sort_{key}")
+
+    symbol = None if holding == "All" else holding
+    metric = FEED_SORTS[sort]
+    if metric:
+        return get_top_portfolios(metric, symbol=symbol, limit=limit)
+    if symbol:
+        return get_portfolios_holding(symbol, limit=limit)
+    return get_latest_portfolios(limit)
 
 def format_pct(val):
     if pd.isna(val) or np.isinf(val): return "0.0%"
     return f"{val*100:.1f}%"
 
+def format_timestamp(ts):
+    if pd.isna(ts): return ""
+    return f"{ts:%Y-%m-%d %H:%M} UTC"
+
 def make_detailed_card_html(ticker, name, stats, capital, color, rankings):
     fin_eq = stats.get('final_equity', 0)
     tot_ret = stats.get('total_return', 0)
@@ -69,25 +108,22 @@ def render_community_section(weights, years, rebal_freq, stop_loss, stats):
         
         if submitted:
             if user_name and comment:
-                # Création de la chaîne formatée avec les pourcentages : "AAPL (50%), MSFT (50%)"
-                tickers_str_list = []
-                for ticker, w in weights.items():
-                    if w > 0:
-                        tickers_str_list.append(f"{ticker} ({w*100:.0f}%)")
-                tickers_formatted = ", ".join(tickers_str_list)
-                
-                # Sauvegarde
-                save_portfolio_db(user_name, comment, tickers_formatted, years, rebal_freq, stop_loss, stats)
-                st.success("Published successfully!")
-                time.sleep(0.5)
-                st.rerun() # Rafraichit le fragment pour afficher le nouveau commentaire
+                # Sauvegarde (ligne du portefeuille + positions normalisées) ; succès
+                # annoncé seulement une fois l'écriture faite
+                ok, result = submit_and_wait(save_portfolio_db, user_name, comment, dict(weights), years,
+                                             rebal_freq, stop_loss, dict(stats))
+                if ok:
+                    st.toast("Published successfully!", icon="✅")
+                    st.rerun() # Rafraichit le fragment pour afficher le nouveau commentaire
+                else:
+                    st.error(f"Could not publish: {result}")
             else:
                 st.error("Please fill Name and Comment.")
 
     # 2. FLUX DES COMMENTAIRES (FEED)
     st.markdown("#### Latest Strategies")
     try:
-        df_shared = get_latest_portfolios(10) # On en prend 10
+        df_shared = load_community_feed("form") # On en prend 10
         if not df_shared.empty:
             for index, row in df_shared.iterrows():
                 # Conteneur pour aligner le bouton supprimer à droite
@@ -97,7 +133,7 @@ def render_community_section(weights, years, rebal_freq, stop_loss, stats):
                     <div style="border:1px solid #444; border-radius:8px; padding:15px; margin-bottom:5px; background-color:rgba(255,255,255,0.02); position: relative;">
                         <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:5px;">
                             <span style="font-weight:bold; color:#1C83E1;">{row['user_name']}</span>
-                            <span style="font-size:0.8em; color:gray;">{row['timestamp']}</span>
+                            <span style="font-size:0.8em; color:gray;">{format_timestamp(row['timestamp'])}</span>
                         </div>
                         <div style="font-style:italic; margin-bottom:10px; color:#ddd;">"{row['comment']}"</div>
                         <div style="font-size:0.85em; color:gray; margin-bottom:8px;">
@@ -117,7 +153,7 @@ def render_community_section(weights, years, rebal_freq, stop_loss, stats):
                     col_space, col_del = st.columns([0.9, 0.1])
                     with col_del:
                         if st.button("🗑️", key=f"del_comm_{row['id']}", help="Delete this portfolio"):
-                            delete_portfolio_db(row['id'])
+                            get_write_queue().submit(delete_portfolio_db, row['id'], session=get_session_id())
                             st.rerun() # Rafraichit le fragment immédiatement
                 
         else:
@@ -153,6 +189,10 @@ def render_portfolio_view(df_assets):
         if f"w_{t}" not in st.session_state: st.session_state[f"w_{t}"] = int(100/len(tickers))
             
     c_opt1, c_opt2, c_opt3, _ = st.columns([1,1,1,1])
+
+    # Avertissements de la dernière optimisation, gardés en session pour survivre au st.rerun()
+    if 'opt_failures' in st.session_state:
+        warn_failed_tickers(*st.session_state.pop('opt_failures'))
     
     if c_opt1.button("Equal Weight"):
         eq = int(100/len(tickers))
@@ -161,23 +201,30 @@ def render_portfolio_view(df_assets):
 
     if c_opt2.button("Maximize Sharpe"):
         with st.spinner("Optimizing weights..."):
-            df_opt = get_portfolio_data(tickers, years)
+            df_opt, failures = load_portfolio_prices(tickers, years)
             if not df_opt.empty:
                 best_w = get_optimized_weights(df_opt, 'sharpe')
                 if best_w is not None:
-                    for i, t in enumerate(tickers):
-                        st.session_state[f"w_{t}"] = int(best_w[i]*100)
+                    # Les poids suivent les colonnes réellement chargées
+                    opt_map = dict(zip(df_opt.columns, best_w))
+                    for t in tickers:
+                        st.session_state[f"w_{t}"] = int(opt_map.get(t, 0.0)*100)
+                    st.session_state['opt_failures'] = (failures, list(df_opt.columns))
                     st.rerun()
+            warn_failed_tickers(failures, df_opt.columns) # Pas de rerun : affichage direct
 
     if c_opt3.button("Minimize Volatility"):
         with st.spinner("Optimizing weights..."):
-            df_opt = get_portfolio_data(tickers, years)
+            df_opt, failures = load_portfolio_prices(tickers, years)
             if not df_opt.empty:
                 best_w = get_optimized_weights(df_opt, 'vol')
                 if best_w is not None:
-                    for i, t in enumerate(tickers):
-                        st.session_state[f"w_{t}"] = int(best_w[i]*100)
+                    opt_map = dict(zip(df_opt.columns, best_w))
+                    for t in tickers:
+                        st.session_state[f"w_{t}"] = int(opt_map.get(t, 0.0)*100)
+                    st.session_state['opt_failures'] = (failures, list(df_opt.columns))
                     st.rerun()
+            warn_failed_tickers(failures, df_opt.columns) # Pas de rerun : affichage direct
 
     st.divider()
 
@@ -208,7 +255,8 @@ def render_portfolio_view(df_assets):
     if submitted:
         
         with st.spinner("Running Simulation..."):
-            df_prices = get_portfolio_data(tickers, years)
+            df_prices, failures = load_portfolio_prices(tickers, years)
+            warn_failed_tickers(failures, df_prices.columns)
             if df_prices.empty:
                 st.error("No data available.")
                 return
@@ -348,7 +396,7 @@ def render_portfolio_view(df_assets):
         # On affiche juste la liste pour que l'utilisateur puisse voir ce qui existe
         # Je duplique légèrement la logique d'affichage ici pour éviter de devoir passer des stats vides au fragment
         try:
-            df_shared = get_latest_portfolios(10)
+            df_shared = load_community_feed("idle")
             if not df_shared.empty:
                 for index, row in df_shared.iterrows():
                     with st.container():
@@ -356,7 +404,7 @@ def render_portfolio_view(df_assets):
                         <div style="border:1px solid #444; border-radius:8px; padding:15px; margin-bottom:5px; background-color:rgba(255,255,255,0.02); position: relative;">
                             <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:5px;">
                                 <span style="font-weight:bold; color:#1C83E1;">{row['user_name']}</span>
-                                <span style="font-size:0.8em; color:gray;">{row['timestamp']}</span>
+                                <span style="font-size:0.8em; color:gray;">{format_timestamp(row['timestamp'])}</span>
                             </div>
                             <div style="font-style:italic; margin-bottom:10px; color:#ddd;">"{row['comment']}"</div>
                             <div style="font-size:0.85em; color:gray; margin-bottom:8px;">
@@ -373,7 +421,7 @@ def render_portfolio_view(df_assets):
                         col_space, col_del = st.columns([0.9, 0.1])
                         with col_del:
                             if st.button("🗑️", key=f"del_comm_idle_{row['id']}", help="Delete this portfolio"):
-                                delete_portfolio_db(row['id'])
+                                get_write_queue().submit(delete_portfolio_db, row['id'], session=get_session_id())
                                 st.rerun()
             else:
                 st.info("No shared portfolios yet.")
@@ -1,9 +1,29 @@
 import streamlit as st
 import pandas as pd
 import time
-from data.database import get_market_reports_db
+from datetime import datetime, timedelta
+from data.database import query_market_reports, count_market_reports, get_report_symbols, scan_market_reports
 from jobs.job_scheduler import run_job
 from data.mock_generator import reset_and_fill_mock_data
+from jobs.telemetry import get_job_runs, duration_percentiles, get_run_tickers, JOB_INTERVALS
+
+PAGE_SIZE = 200
+
+# Libellé -> nombre de jours (None = tout l'historique)
+TIME_RANGES = {"Last 24h": 1, "Last 7 days": 7, "Last 30 days": 30, "All": None}
+
+COLS_TO_SHOW = ["id", "timestamp", "symbol", "period", "price_close", "volatility", "max_drawdown", "volume"]
+
+COL_CFG = {
+    "id": st.column_config.NumberColumn("ID", width="small"),
+    "timestamp": st.column_config.DatetimeColumn("Time", format="D MMM, HH:mm"),
+    "symbol": "Ticker",
+    "period": "Type",
+    "price_close": st.column_config.NumberColumn("Close", format="$%.2f"),
+    "volatility": st.column_config.NumberColumn("Vol", format="%.2f"),
+    "max_drawdown": st.column_config.NumberColumn("Max DD", format="%.2f"),
+    "volume": "Volume"
+}
 
 def render_reports_view():
     st.subheader("Market Reports (Database)")
@@ -32,56 +52,118 @@ def render_reports_view():
                 time.sleep(1.5)
                 st.rerun()
 
+    # --- JOB TELEMETRY ---
+    with st.expander("Job Telemetry"):
+        render_job_telemetry()
+
     # --- DATA FETCH ---
-    df = get_market_reports_db()
+    # Les filtres et la pagination sont faits en SQL : on ne charge que les lignes affichées
+    tickers = get_report_symbols()
     
-    if df.empty:
+    if not tickers:
         st.info("Database is empty. Use buttons above.")
         return
 
     # --- FILTERS ---
-    tickers = sorted(df['symbol'].unique())
-    selected_ticker = st.selectbox("Filter by Asset", ["All"] + list(tickers))
-    
-    if selected_ticker != "All":
-        df = df[df['symbol'] == selected_ticker]
+    c_tick, c_range = st.columns([0.6, 0.4])
+    with c_tick:
+        selected_ticker = st.selectbox("Filter by Asset", ["All"] + list(tickers))
+    with c_range:
+        range_label = st.selectbox("Time Range", list(TIME_RANGES.keys()), index=len(TIME_RANGES) - 1)
+
+    symbol = None if selected_ticker == "All" else selected_ticker
+    days = TIME_RANGES[range_label]
+    start = datetime.now() - timedelta(days=days) if days else None
 
     # --- TABS (Ajout de l'onglet INSTANT si vous le souhaitez, sinon All Records suffit) ---
-    tab_all, tab_daily, tab_hourly = st.tabs(["All Records", "Daily Reports", "Hourly/Instant"])
-    
-    col_cfg = {
-        "id": st.column_config.NumberColumn("ID", width="small"),
-        "timestamp": st.column_config.DatetimeColumn("Time", format="D MMM, HH:mm"),
-        "symbol": "Ticker",
-        "period": "Type",
-        "price_close": st.column_config.NumberColumn("Close", format="$%.2f"),
-        "volatility": st.column_config.NumberColumn("Vol", format="%.2f"),
-        "max_drawdown": st.column_config.NumberColumn("Max DD", format="%.2f"),
-        "volume": "Volume"
-    }
-
-    cols_to_show = ["id", "timestamp", "symbol", "period", "price_close", "volatility", "max_drawdown", "volume"]
+    tab_all, tab_daily, tab_hourly, tab_weekly = st.tabs(["All Records", "Daily Reports", "Hourly/Instant", "Weekly"])
 
     with tab_all:
-        st.dataframe(df[cols_to_show], use_container_width=True, column_config=col_cfg, hide_index=True)
+        _render_reports_page("all", symbol, None, start)
     
     with tab_daily:
-        df_daily = df[df['period'] == 'DAILY']
-        if df_daily.empty:
-            st.warning("No Daily reports found yet.")
-        else:
-            st.dataframe(df_daily[cols_to_show], use_container_width=True, column_config=col_cfg, hide_index=True)
-            if selected_ticker != "All":
+        # Rapports journaliers + agrégats des anciens rapports horaires (jobs/rollup.py)
+        if _render_reports_page("daily", symbol, ["DAILY", "DAILY_ROLLUP"], start, empty_msg="No Daily reports found yet."):
+            if symbol:
                 st.caption(f"Daily Closing Price - {selected_ticker}")
-                st.line_chart(df_daily.set_index("timestamp")["price_close"])
+                _render_close_chart(symbol, ["DAILY", "DAILY_ROLLUP"], start)
 
     with tab_hourly:
         # On affiche ici HOURLY et INSTANT ensemble pour voir l'intraday
-        df_hourly = df[df['period'].isin(['HOURLY', 'INSTANT'])]
-        if df_hourly.empty:
-            st.warning("No Hourly reports found yet.")
-        else:
-            st.dataframe(df_hourly[cols_to_show], use_container_width=True, column_config=col_cfg, hide_index=True)
-            if selected_ticker != "All":
+        if _render_reports_page("hourly", symbol, ["HOURLY", "INSTANT"], start, empty_msg="No Hourly reports found yet."):
+            if symbol:
                 st.caption(f"Hourly Price Action - {selected_ticker}")
-                st.line_chart(df_hourly.set_index("timestamp")["price_close"])
\ No newline at end of file
+                _render_close_chart(symbol, ["HOURLY", "INSTANT"], start)
+
+    with tab_weekly:
+        if _render_reports_page("weekly", symbol, ["WEEKLY_ROLLUP"], start, empty_msg="No Weekly rollups yet."):
+            if symbol:
+                st.caption(f"Weekly Closing Price - {selected_ticker}")
+                _render_close_chart(symbol, ["WEEKLY_ROLLUP"], start)
+
+
+def _render_reports_page(key, symbol, periods, start, empty_msg="No reports found."):
+    """Affiche une page de rapports ; renvoie False si aucun rapport ne correspond."""
+    total = count_market_reports(symbol=symbol, periods=periods, start=start)
+    if total == 0:
+        st.warning(empty_msg)
+        return False
+
+    n_pages = (total - 1) // PAGE_SIZE + 1
+    page = 1
+    if n_pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"reports_page_{key}")
+    st.caption(f"{total} records - page {page}/{n_pages}")
+
+    df = query_market_reports(symbol=symbol, periods=periods, start=start,
+                              limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE, columns=COLS_TO_SHOW)
+    st.dataframe(df, use_container_width=True, column_config=COL_CFG, hide_index=True)
+    return True
+
+def _render_close_chart(symbol, periods, start):
+    # Série déjà typée (datetime64) et triée, lue dans l'index couvrant
+    df = scan_market_reports(symbol, periods=periods, start=start)
+    if not df.empty:
+        st.line_chart(df["price_close"])
+
+def render_job_telemetry():
+    """Durées des jobs planifiés (percentiles par jour) et détail du dernier run."""
+    c_job, c_days = st.columns(2)
+    with c_job:
+        job = st.selectbox("Job", list(JOB_INTERVALS.keys()), key="telemetry_job")
+    with c_days:
+        days = st.selectbox("Window", [7, 30, 90], index=1, format_func=lambda d: f"Last {d} days", key="telemetry_days")
+
+    since = datetime.now() - timedelta(days=days)
+    pct = duration_percentiles(job, freq="D", since=since)
+    if pct.empty:
+        st.info(f"No {job} runs recorded yet.")
+        return
+
+    interval = JOB_INTERVALS[job]
+    worst_p90 = pct["p90"].max()
+    if worst_p90 > 0.5 * interval:
+        st.warning(f"p90 duration reached {worst_p90:.0f}s, more than half of the {interval}s job interval.")
+
+    st.caption("Run duration percentiles per day (seconds)")
+    st.line_chart(pct[["p50", "p90", "p99", "max"]])
+
+    runs = get_job_runs(job, since=since, limit=50)
+    if runs.empty:
+        st.info(f"No {job} runs in the last {days} days.")
+        return
+    st.dataframe(
+        runs[["started_at", "duration", "status", "tickers", "failures", "retries", "reports",
+              "rows_fetched", "fetch_seconds", "compute_seconds", "write_seconds", "error"]],
+        use_container_width=True, hide_index=True,
+        column_config={
+            "started_at": st.column_config.DatetimeColumn("Start", format="D MMM, HH:mm"),
+            "duration": st.column_config.NumberColumn("Duration (s)", format="%.2f"),
+            "fetch_seconds": st.column_config.NumberColumn("Fetch (s)", format="%.2f"),
+            "compute_seconds": st.column_config.NumberColumn("Compute (s)", format="%.3f"),
+            "write_seconds": st.column_config.NumberColumn("Write (s)", format="%.3f"),
+        },
+    )
+
+    st.caption("Slowest tickers - last run")
+    st.dataframe(get_run_tickers(runs["id"].iloc[0]).head(10), use_container_width=True, hide_index=True)
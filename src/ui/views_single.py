@@ -2,10 +2,18 @@ import streamlit as st
 import pandas as pd
 from logic.single_logic import (
     update_analyses_duration, sync_tape_to_graphs, add_analysis_to_state, 
-    remove_analysis, get_rankings, get_full_history_for_prediction, COLORS
+    remove_analysis, get_rankings, get_full_history_for_prediction, compute_macd_grid, COLORS
 )
-from ui.single_components import render_main_chart, render_metric_card_html, render_prediction_chart
+from ui.single_components import render_main_chart, render_metric_card_html, render_prediction_chart, render_macd_heatmap
 from logic.prediction import run_prediction_model
+from logic.strategies_single import STRATEGIES, macd_heatmap
+
+TUNING_METRICS = {
+    "Sharpe Ratio": "sharpe_ratio",
+    "Total Return": "total_return",
+    "Annualized Return": "annualized_return",
+    "Max Drawdown": "max_drawdown",
+}
 
 def render_single_asset_view(df_assets):
     name_map = df_assets.set_index('Symbol')['Name'].to_dict()
@@ -82,13 +90,17 @@ def render_single_asset_view(df_assets):
                                 tape_tickers = st.session_state.get('tape_tickers', [])
                                 if tape_tickers:
                                     s_tick = st.selectbox("Asset", tape_tickers, key="s_add_t")
-                                    s_st = st.selectbox("Strategy", ["Buy & Hold", "Momentum SMA", "MACD"], key="s_add_s")
+                                    s_st = st.selectbox("Strategy", list(STRATEGIES.keys()), key="s_add_s")
                                     p = {}
                                     if s_st == "Momentum SMA": p["window"] = st.slider("Win", 10, 200, 50, key="sw")
                                     elif s_st == "MACD": 
                                         p["fast"] = st.number_input("Fast", value=12, key="mf")
                                         p["slow"] = st.number_input("Slow", value=26, key="ms")
                                         p["signal"] = st.number_input("Sig", value=9, key="msig")
+                                    else:
+                                        # Stratégies ajoutées au registre : un champ par paramètre
+                                        for name, default in STRATEGIES[s_st].defaults.items():
+                                            p[name] = st.number_input(name.capitalize(), value=default, key=f"sp_{s_st}_{name}")
                                     cap = st.number_input("Cap", value=1000.0, key="scap")
                                     
                                     if st.button("Add", type="primary"):
@@ -102,6 +114,10 @@ def render_single_asset_view(df_assets):
                             </div>
                             """, unsafe_allow_html=True)
 
+        # --- MACD TUNING ---
+        with st.expander("🔧 MACD Tuning"):
+            render_macd_tuning(years)
+
     # ==============================================================================
     # COL 2 : PRICE HISTORY & PREDICTION
     # ==============================================================================
@@ -192,4 +208,45 @@ def render_single_asset_view(df_assets):
                         c1, c2, c3 = st.columns(3)
                         c1.metric("MAE", f"{mets.get('MAE',0):.2f}")
                         c2.metric("RMSE", f"{mets.get('RMSE',0):.2f}")
-                        c3.metric("R²", f"{mets.get('R2',0):.2f}")
\ No newline at end of file
+                        c3.metric("R²", f"{mets.get('R2',0):.2f}")
+
+def render_macd_tuning(years):
+    """Grille (fast, slow, signal) évaluée en un seul calcul, classement + heatmap."""
+    tape_tickers = st.session_state.get('tape_tickers', [])
+    if not tape_tickers:
+        st.info("Add assets to the tape to tune a strategy.")
+        return
+
+    c_t, c_m = st.columns(2)
+    with c_t: ticker = st.selectbox("Asset", tape_tickers, key="mt_ticker")
+    with c_m: metric_label = st.selectbox("Rank by", list(TUNING_METRICS.keys()), key="mt_metric")
+    fast = st.slider("Fast", 2, 50, (5, 20), key="mt_fast")
+    slow = st.slider("Slow", 5, 120, (15, 60), key="mt_slow")
+    sig = st.slider("Signal", 2, 30, (3, 15), key="mt_sig")
+
+    if st.button("Run Grid", key="mt_run"):
+        grid = compute_macd_grid(
+            ticker, years, range(fast[0], fast[1] + 1), range(slow[0], slow[1] + 1),
+            range(sig[0], sig[1] + 1), rank_by=TUNING_METRICS[metric_label],
+        )
+        st.session_state['macd_grid'] = {"ticker": ticker, "years": years, "metric": metric_label, "grid": grid}
+
+    res = st.session_state.get('macd_grid')
+    if not res: return
+    grid = res['grid']
+    if grid.empty:
+        st.warning(f"No result for {res['ticker']}.")
+        return
+
+    best = grid.iloc[0]
+    st.caption(f"{res['ticker']} - {len(grid)} combinations over {res['years']} years, ranked by {res['metric']}")
+    st.dataframe(grid.head(20), use_container_width=True, hide_index=True)
+
+    signals = sorted(grid['signal'].unique())
+    h_sig = st.select_slider("Heatmap signal", options=signals, value=int(best['signal']), key="mt_heat_sig")
+    render_macd_heatmap(macd_heatmap(grid, TUNING_METRICS[res['metric']], signal=h_sig), res['metric'])
+
+    params = {"fast": int(best['fast']), "slow": int(best['slow']), "signal": int(best['signal'])}
+    if st.button(f"Add MACD({params['fast']},{params['slow']},{params['signal']}) to comparison", key="mt_add"):
+        add_analysis_to_state(res['ticker'], "MACD", params, 1000.0, years)
+        st.rerun()
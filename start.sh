@@ -1,7 +1,9 @@
 #!/bin/bash
 
-# Start the cron service in the background
-service cron start
+# Start the resident job scheduler in the background (replaces cron)
+# Same working directory as Streamlit (relative DB / cache paths must match);
+# src/ on PYTHONPATH so that `data`, `jobs`... are importable
+PYTHONPATH=src python3 -u -m jobs.scheduler_daemon >> /var/log/scheduler.log 2>&1 &
 
 # Run the Streamlit app
 # --server.port=8080: Matches the internal_port in fly.toml